@@ -0,0 +1,29 @@
+import asyncio
+import logging
+from config import ARCHIVE_INTERVAL, ARCHIVE_BATCH_SIZE, ARCHIVE_DELAY
+import db
+
+async def archive_once():
+    """Переносит в архив все созревшие закрытые комнаты пачками по ARCHIVE_BATCH_SIZE."""
+    total = 0
+    while True:
+        # События и голоса комнаты могли ещё лежать в очередях записи
+        for writer in db.batch_writers:
+            await writer.flush()
+        async with db.get_pool().acquire() as conn:
+            moved = await db.archive_closed_rooms(conn, ARCHIVE_BATCH_SIZE, ARCHIVE_DELAY)
+        total += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            return total
+        # Не держим цикл событий и пул занятыми подряд
+        await asyncio.sleep(0)
+
+async def run_archiver():
+    while True:
+        try:
+            moved = await archive_once()
+            if moved:
+                logging.info(f"В архив перенесено комнат: {moved}")
+        except Exception:
+            logging.exception("Ошибка архивации закрытых комнат")
+        await asyncio.sleep(ARCHIVE_INTERVAL)
@@ -0,0 +1,121 @@
+"""Время холодного старта: отчёт в стиле `python -X importtime` по модулям.
+
+    python bench/importtime.py                 # топ модулей и сравнение с базой
+    python bench/importtime.py --save          # записать базовые результаты
+
+Импорт `main` повторяется в отдельном процессе несколько раз, для каждого
+модуля берётся минимальное кумулятивное время. После каждого прогона так же
+замеряется импорт эталонного модуля стандартной библиотеки (REFERENCE_MODULE), и
+с базой сравнивается медиана отношений времени модуля к эталону (она и хранится
+в базе), поэтому сравнение не зависит от скорости и загрузки машины.
+
+Код выхода 1, если модуль проекта или суммарный старт стали медленнее базы больше
+чем на --tolerance и на --min-delta микросекунд, а также если при импорте
+подтянулся клиент Google API (он должен грузиться лениво).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "importtime_baseline.json")
+PROJECT_MODULES = (
+    'main', 'config', 'db', 'utils', 'google_sheets', 'handlers', 'decks', 'deck_sources',
+    'snapshot', 'events', 'scheduler', 'middlewares', 'archive',
+)
+REFERENCE_MODULE = 'asyncio'
+# Тяжёлые зависимости, которых не должно быть в холодном старте
+FORBIDDEN_MODULES = ('googleapiclient', 'google.oauth2')
+
+
+def run_once(target):
+    env = dict(os.environ)
+    env.setdefault("ADMIN_ID", "1")
+    env.setdefault("BOT_TOKEN", "123456:bench")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def matches(name, modules):
+    return any(name == m or name.startswith(m + ".") for m in modules)
+
+
+def is_project_module(name):
+    return matches(name, PROJECT_MODULES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="main", help="модуль, импорт которого измеряется")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--save", action="store_true", help="перезаписать базовые результаты")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="допустимое замедление (0.5 = +50%%)")
+    parser.add_argument("--min-delta", type=int, default=1000,
+                        help="замедление меньше стольких микросекунд не считается регрессией")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    best = {}
+    ratios = {}
+    for _ in range(args.runs):
+        times = run_once(args.target)
+        # Эталон замеряем сразу после цели, чтобы оба попали под одну загрузку машины
+        reference_us = run_once(REFERENCE_MODULE)[REFERENCE_MODULE]
+        for name, us in times.items():
+            best[name] = min(us, best.get(name, us))
+            ratios.setdefault(name, []).append(us / reference_us)
+
+    print(f"Топ-{args.top} модулей по кумулятивному времени импорта:")
+    for name, us in sorted(best.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"{us / 1000:>10.1f} ms  {name}")
+
+    forbidden = sorted(name for name in best if matches(name, FORBIDDEN_MODULES))
+    if forbidden:
+        print(f"\nПри импорте {args.target} загружены запрещённые модули: {', '.join(forbidden)}")
+        sys.exit(1)
+
+    tracked = {name: statistics.median(ratios[name]) for name in best if is_project_module(name)}
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(tracked, f, indent=2, sort_keys=True)
+        print(f"Базовые результаты сохранены в {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = []
+    print("\nМодули проекта относительно базы:")
+    for name, ratio in sorted(tracked.items()):
+        base = baseline.get(name)
+        if not base:
+            continue
+        us = best[name]
+        change = ratio / base - 1
+        mark = ""
+        # База в микросекундах этого прогона: us / (1 + change)
+        if change > args.tolerance and us - us / (1 + change) > args.min_delta:
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(f"{us / 1000:>10.1f} ms  {change:+7.1%}  {name}{mark}")
+    if regressions:
+        print(f"Регрессия больше {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Нагрузочный тест бота: aiohttp-приложение из main.py + локальный Postgres + фейковый Bot API.
+
+Запуск (база будет ОЧИЩЕНА, поэтому используйте отдельную тестовую БД):
+
+    BENCH_DATABASE_URL=postgresql://localhost/bunker_bench python bench/loadtest.py --rate 200
+
+Сценарии: вход 50 игроков, спам /me и /info, админский /shuffle.
+Для каждого считаются p50/p99 задержки, пропускная способность и число запросов к БД на апдейт.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ADMIN_ID = 1
+FAKE_API_PORT = 8581
+APP_PORT = 8580
+
+# Окружение нужно выставить до импорта config
+os.environ.setdefault("BOT_TOKEN", "123456:bench")
+os.environ.setdefault("ADMIN_ID", str(ADMIN_ID))
+os.environ.setdefault("WEBHOOK_URL", f"http://127.0.0.1:{APP_PORT}")
+os.environ["TELEGRAM_API_URL"] = f"http://127.0.0.1:{FAKE_API_PORT}"
+# Синтетическая колода не должна попасть в снимок состояния, а чужой снимок - в прогон
+os.environ["SNAPSHOT_PATH"] = ""
+# Троттлинг отбросил бы часть спама, и сценарии измеряли бы отказы, а не путь до БД
+os.environ["THROTTLE_RATE"] = "0"
+if os.getenv("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+
+from aiohttp import ClientSession, web  # noqa: E402
+
+import db  # noqa: E402
+import main as bot_main  # noqa: E402
+from config import WEBHOOK_PATH  # noqa: E402
+import decks  # noqa: E402
+
+
+class FakeBotAPI:
+    """Минимальный Bot API: записывает вызовы и отвечает валидными объектами."""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.message_ids = itertools.count(1)
+
+    async def handle(self, request):
+        method = request.match_info['method']
+        self.calls[method] += 1
+        data = await request.post()
+        if method == "sendMessage":
+            result = {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": int(data.get("chat_id", 0)), "type": "private"},
+                "text": data.get("text", ""),
+            }
+        elif method == "getMe":
+            result = {"id": 123456, "is_bot": True, "first_name": "bench", "username": "bench_bot"}
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, record):
+        self.count += 1
+
+    async def install(self, conn):
+        conn.add_query_logger(self)
+
+
+class Pacer:
+    """Выдаёт слоты для отправки апдейтов с заданной частотой."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.next_slot = time.perf_counter()
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.perf_counter()
+            delay = self.next_slot - now
+            self.next_slot = max(self.next_slot, now) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class Client:
+    def __init__(self, session, pacer):
+        self.session = session
+        self.pacer = pacer
+        self.update_ids = itertools.count(1)
+        self.latencies = []
+
+    def make_update(self, user_id, text):
+        update_id = next(self.update_ids)
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"P{user_id}", "username": f"p{user_id}"},
+                "text": text,
+            },
+        }
+
+    async def send(self, user_id, text):
+        await self.pacer.wait()
+        payload = self.make_update(user_id, text)
+        started = time.perf_counter()
+        async with self.session.post(f"http://127.0.0.1:{APP_PORT}{WEBHOOK_PATH}", json=payload) as resp:
+            await resp.read()
+            resp.raise_for_status()
+        self.latencies.append(time.perf_counter() - started)
+
+
+def make_deck(size):
+    return {
+        cat: [f"{cat}-{i}" for i in range(size)]
+        for cat in ('bio', 'prof', 'health', 'hobby', 'luggage', 'fact', 'special')
+    }
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+async def run_scenario(name, client, counter, fake_api, coro_factory):
+    client.latencies = []
+    counter.count = 0
+    fake_api.calls.clear()
+    started = time.perf_counter()
+    await coro_factory()
+    elapsed = time.perf_counter() - started
+    n = len(client.latencies)
+    return {
+        "scenario": name,
+        "updates": n,
+        "p50_ms": percentile(client.latencies, 0.50) * 1000,
+        "p99_ms": percentile(client.latencies, 0.99) * 1000,
+        "throughput_rps": n / elapsed,
+        "db_queries_per_update": counter.count / n,
+        "api_calls": dict(fake_api.calls),
+    }
+
+
+async def run(args):
+    fake_api = FakeBotAPI()
+    api_runner = web.AppRunner(fake_api.app(), access_log=None)
+    await api_runner.setup()
+    await web.TCPSite(api_runner, "127.0.0.1", FAKE_API_PORT).start()
+
+    counter = QueryCounter()
+    app = bot_main.create_app()
+    app[bot_main.POOL_OPTIONS] = {'init': counter.install}
+    app_runner = web.AppRunner(app, access_log=None)
+    await app_runner.setup()
+    await web.TCPSite(app_runner, "127.0.0.1", APP_PORT).start()
+
+    pool = db.get_pool()
+    async with pool.acquire() as conn:
+        await conn.execute("TRUNCATE rooms, players CASCADE")
+    decks.cache.put(decks.Deck(decks.DEFAULT_DECK, make_deck(args.deck_size)))
+
+    players = [1000 + i for i in range(args.players)]
+    results = []
+    async with ClientSession() as session:
+        client = Client(session, Pacer(args.rate))
+        await client.send(ADMIN_ID, "/createroom")
+        async with pool.acquire() as conn:
+            code = await conn.fetchval("SELECT code FROM rooms WHERE is_active = TRUE")
+
+        async def join_one(user_id):
+            await client.send(user_id, f"/room {code}")
+            await client.send(user_id, f"Игрок {user_id}")
+
+        async def join_burst():
+            await asyncio.gather(*(join_one(uid) for uid in players))
+
+        async def command_spam():
+            await asyncio.gather(*(
+                client.send(players[i % len(players)], "/me" if i % 2 else "/info")
+                for i in range(args.spam)
+            ))
+
+        async def admin_shuffle():
+            for _ in range(args.shuffles):
+                await client.send(ADMIN_ID, "/shuffle")
+                await client.send(ADMIN_ID, "Багаж")
+
+        results.append(await run_scenario("join_burst", client, counter, fake_api, join_burst))
+        results.append(await run_scenario("me_info_spam", client, counter, fake_api, command_spam))
+        results.append(await run_scenario("admin_shuffle", client, counter, fake_api, admin_shuffle))
+
+    await app_runner.cleanup()
+    await api_runner.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=100.0, help="апдейтов в секунду (0 - без ограничения)")
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--spam", type=int, default=500, help="число запросов /me и /info")
+    parser.add_argument("--shuffles", type=int, default=10)
+    parser.add_argument("--deck-size", type=int, default=1000, help="карт в каждой категории")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    args = parser.parse_args()
+    if not os.getenv("BENCH_DATABASE_URL"):
+        parser.error("укажите BENCH_DATABASE_URL (база будет очищена)")
+
+    results = asyncio.run(run(args))
+    print(f"{'scenario':<16}{'updates':>8}{'p50, ms':>10}{'p99, ms':>10}{'upd/s':>10}{'db/upd':>8}")
+    for r in results:
+        print(f"{r['scenario']:<16}{r['updates']:>8}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['throughput_rps']:>10.1f}{r['db_queries_per_update']:>8.2f}  {r['api_calls']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Микробенчмарки горячих путей: выбор карт, utils и форматирование карточек.
+
+    python bench/microbench.py --save     # записать базовые результаты
+    python bench/microbench.py            # сравнить с базой, код выхода 1 при регрессии
+
+Размер колоды меняется от 100 до 100k карт, размер комнаты - от 2 до 50 игроков.
+Время - медиана нескольких замеров, в микросекундах на вызов.
+
+Замеры случая чередуются с калибровочным циклом на чистом Python, и с базой
+сравнивается медиана отношений времени случая к калибровке (она и хранится в базе).
+Так сравнение не зависит от скорости машины и от её загрузки во время прогона.
+Регрессией считается замедление больше --tolerance, если оно к тому же больше
+--min-delta микросекунд и не пропадает после --confirm повторных замеров: случаи
+по 1-10 us дрожат на десятки процентов без изменений в коде.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("ADMIN_ID", "1")
+
+import decks  # noqa: E402
+import utils  # noqa: E402
+from handlers.info import format_revealed_info  # noqa: E402
+from handlers.player import format_player_card  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "microbench_baseline.json")
+DECK_SIZES = (100, 1_000, 10_000, 100_000)
+ROOM_SIZES = (2, 10, 50)
+
+
+def make_player(i):
+    return {
+        'name': f"Игрок {i}", 'bio': f"bio-{i}", 'prof': f"prof-{i}", 'health': f"health-{i}",
+        'hobby': f"hobby-{i}", 'luggage1': f"luggage-{2 * i}", 'luggage2': f"luggage-{2 * i + 1}",
+        'fact': f"fact-{i}", 'special1': f"special-{2 * i}", 'special2': f"special-{2 * i + 1}",
+        'revealed': ['bio', 'prof', 'health', 'hobby', 'luggage', 'fact'][:i % 7],
+    }
+
+
+def make_rule_deck(size, rule_count):
+    categories = {cat: {f"{cat}-{i}": 1.0 for i in range(size)} for cat in decks.CATEGORIES}
+    rules = [
+        (random.choice(('exclude', 'synergy')), cat1, f"{cat1}-{random.randrange(size)}", cat2, f"{cat2}-{random.randrange(size)}")
+        for cat1, cat2 in (random.sample(decks.CATEGORIES, 2) for _ in range(rule_count))
+    ]
+    return decks.Deck("bench", categories, rules)
+
+
+def cases():
+    """Возвращает пары (имя, функция без аргументов)."""
+    for deck_size in DECK_SIZES:
+        deck = [f"card-{i}" for i in range(deck_size)]
+        # Таблица псевдонимов строится один раз на колоду, в замер входит только выбор
+        pool = utils.WeightedPool(deck, [random.choice((1.0, 0.3, 0.1)) for _ in deck])
+        for room_size in ROOM_SIZES:
+            # В комнате из N игроков уже занято N карт категории
+            used = random.sample(deck, min(room_size, deck_size - 1))
+            yield (f"get_random_unique_values[deck={deck_size},room={room_size}]",
+                   lambda deck=deck, used=used: utils.get_random_unique_values(deck, used))
+            yield (f"WeightedPool.sample[deck={deck_size},room={room_size}]",
+                   lambda pool=pool, used=used: pool.sample(used))
+    for room_size in ROOM_SIZES:
+        players = [make_player(i) for i in range(room_size)]
+        yield (f"shuffle_luggage[room={room_size}]",
+               lambda players=players: utils.shuffle_luggage(players))
+        yield (f"format_revealed_info[room={room_size}]",
+               lambda players=players: format_revealed_info(players))
+    for rule_count in (0, 100, 1_000):
+        deck = make_rule_deck(10_000, rule_count)
+        used = decks.used_cards([make_player(i) for i in range(10)])
+        yield (f"Deck.deal_hand[deck=10000,rules={rule_count}]", lambda deck=deck, used=used: deck.deal_hand(used))
+    player = make_player(1)
+    yield ("format_player_card", lambda: format_player_card(player))
+    yield ("generate_room_code", utils.generate_room_code)
+
+
+def calibration():
+    """Эталонная нагрузка: словари, строки и random, как в горячих путях бота."""
+    values = {f"key-{i}": random.random() for i in range(100)}
+    return sorted(values, key=values.get)[:10]
+
+
+def autorange(func):
+    """Таймер функции и число вызовов на один замер (примерно 0.04 с)."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return timer, max(1, number // 5)
+
+
+def measure(func, repeat):
+    """Медианы времени вызова (us) и его отношения к калибровке по repeat парным замерам.
+
+    Замеры случая и калибровки чередуются, поэтому оба попадают под одну и ту же
+    загрузку машины, и отношение в паре почти не дрожит.
+    """
+    timer, number = autorange(func)
+    calibration_timer, calibration_number = autorange(calibration)
+    times = []
+    ratios = []
+    for _ in range(repeat):
+        us = timer.timeit(number) / number * 1e6
+        calibration_us = calibration_timer.timeit(calibration_number) / calibration_number * 1e6
+        times.append(us)
+        ratios.append(us / calibration_us)
+    return statistics.median(times), statistics.median(ratios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="перезаписать базовые результаты")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимое замедление (0.25 = +25%%)")
+    parser.add_argument("--repeat", type=int, default=9)
+    parser.add_argument("--min-delta", type=float, default=2.0,
+                        help="замедление меньше стольких микросекунд не считается регрессией")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="сколько раз перемерить случай, прежде чем признать регрессию")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    random.seed(0)
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    def is_regression(us, change):
+        # База в микросекундах этого прогона: us / (1 + change)
+        return change > args.tolerance and us - us / (1 + change) > args.min_delta
+
+    results = {}
+    regressions = []
+    for name, func in cases():
+        us, ratio = measure(func, args.repeat)
+        base = baseline.get(name)
+        if base is None:
+            results[name] = ratio
+            print(f"{name:<60}{us:>12.2f} us")
+            continue
+        # Одиночный выброс не считаем регрессией: подозрительный случай перемеряем
+        for _ in range(args.confirm):
+            if not is_regression(us, ratio / base - 1):
+                break
+            us, ratio = min((us, ratio), measure(func, args.repeat), key=lambda m: m[1])
+        results[name] = ratio
+        change = ratio / base - 1
+        mark = ""
+        if is_regression(us, change):
+            regressions.append(name)
+            mark = "  REGRESSION"
+        print(f"{name:<60}{us:>12.2f} us  {change:+7.1%}{mark}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Базовые результаты сохранены в {args.baseline}")
+    if regressions:
+        print(f"Регрессия больше {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
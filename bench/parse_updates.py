@@ -0,0 +1,111 @@
+"""Скорость разбора апдейтов вебхука: апдейтов в секунду на одно ядро.
+
+    python bench/parse_updates.py
+    python bench/parse_updates.py --seconds 3
+
+Сравнивает старый путь (json + Update(**data)) с текущим main.parse_update
+(orjson, если установлен, пропуск ненужных типов и Update.model_validate).
+Смесь апдейтов близка к реальной: команды, ответы в диалогах, нажатия
+кнопок голосования и немного правок и постов каналов, которые бот не обрабатывает.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.setdefault("BOT_TOKEN", "123456:bench")
+
+from aiogram import types  # noqa: E402
+import main as bot_main  # noqa: E402
+
+
+def make_message(update_id, text, key="message"):
+    return {
+        "update_id": update_id,
+        key: {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": 1000 + update_id % 50, "type": "private", "first_name": "Игрок"},
+            "from": {"id": 1000 + update_id % 50, "is_bot": False, "first_name": "Игрок", "username": "player"},
+            "text": text,
+            **({"entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]}
+               if text.startswith("/") else {}),
+        },
+    }
+
+
+def make_callback(update_id):
+    message = make_message(update_id, "🗳 Голосование!")["message"]
+    return {
+        "update_id": update_id,
+        "callback_query": {
+            "id": str(update_id),
+            "from": message["from"],
+            "message": message,
+            "chat_instance": "1",
+            "data": f"vote:1:{1000 + (update_id + 1) % 50}",
+        },
+    }
+
+
+def make_channel_post(update_id):
+    update = make_message(update_id, "новости", key="channel_post")
+    post = update["channel_post"]
+    post["chat"] = {"id": -100, "type": "channel", "title": "Канал"}
+    del post["from"]
+    return update
+
+
+def make_updates(n):
+    updates = []
+    for i in range(n):
+        kind = i % 10
+        if kind < 4:
+            updates.append(make_message(i, ("/me", "/info", "/card1", "/room ABCD")[kind]))
+        elif kind < 6:
+            updates.append(make_message(i, "Биология"))
+        elif kind < 8:
+            updates.append(make_callback(i))
+        elif kind == 8:
+            updates.append(make_message(i, "/me", key="edited_message"))
+        else:
+            updates.append(make_channel_post(i))
+    return [json.dumps(u, ensure_ascii=False).encode("utf-8") for u in updates]
+
+
+def legacy_parse(body):
+    return types.Update(**json.loads(body))
+
+
+def run(parse, bodies, seconds):
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        for body in bodies:
+            parse(body)
+        count += len(bodies)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="длительность замера каждого пути")
+    parser.add_argument("--updates", type=int, default=1000, help="размер набора апдейтов")
+    args = parser.parse_args()
+
+    bot_main.create_app()
+    bodies = make_updates(args.updates)
+    print(f"JSON: {bot_main.loads.__module__}, обрабатываемые типы: {', '.join(sorted(bot_main.used_update_types))}")
+    legacy = run(legacy_parse, bodies, args.seconds)
+    current = run(bot_main.parse_update, bodies, args.seconds)
+    print(f"{'json + Update(**data)':<40}{legacy:>12.0f} upd/s")
+    print(f"{'parse_update':<40}{current:>12.0f} upd/s  x{current / legacy:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,55 @@ load_dotenv()
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Необязательная реплика только для чтения (/me, /info, /players)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Сколько секунд после своей записи пользователь читает из основной БД
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+# Настройки пула asyncpg
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 2))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", 300))
+# Совместимость с PgBouncer (transaction pooling): без кеша prepared statements
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "0") == "1"
 GOOGLE_SHEETS_CREDENTIALS = os.getenv("GOOGLE_SHEETS_CREDENTIALS")
 SPREADSHEET_ID = os.getenv("SPREADSHEET_ID")
+# Колоды: имя колоды -> лист таблицы, например {"base": "Персонажи", "expansion": "Расширение"}
+DECKS = json.loads(os.getenv("DECKS", '{"base": "Персонажи"}'))
+DEFAULT_DECK = os.getenv("DEFAULT_DECK", "base")
+# Необязательные листы с правилами совместимости карт: имя колоды -> лист, например {"base": "Правила"}
+DECK_RULES = json.loads(os.getenv("DECK_RULES", "{}"))
+# Сколько памяти (в байтах, оценочно) могут занимать загруженные колоды
+DECK_CACHE_MAX_BYTES = int(os.getenv("DECK_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+# Откуда брать колоды: "sheets" (Google Sheets) или "files" (CSV/JSONL в DECK_DIR)
+DECK_SOURCE = os.getenv("DECK_SOURCE", "sheets")
+DECK_DIR = os.getenv("DECK_DIR", "deck_files")
+# Сколько строк листа читать за один запрос к Google Sheets
+SHEETS_PAGE_SIZE = int(os.getenv("SHEETS_PAGE_SIZE", 1000))
+# Как часто (в секундах) голоса из памяти сбрасываются в БД
+VOTE_FLUSH_INTERVAL = float(os.getenv("VOTE_FLUSH_INTERVAL", 2))
+# Как часто (в секундах) журнал игровых событий сбрасывается в БД
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", 0.5))
+# Архивация закрытых комнат: период (сек), размер пачки и сколько секунд комната остаётся в основной таблице
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", 600))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 100))
+ARCHIVE_DELAY = float(os.getenv("ARCHIVE_DELAY", 3600))
+# Файл снимка состояния для быстрого перезапуска (пустая строка - не сохранять)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "snapshot.bin")
+# Ограничение частоты сообщений игрока на каждую команду: токенов в секунду и размер запаса.
+# THROTTLE_RATE или THROTTLE_BURST, равные 0, выключают ограничение
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", 0.5))
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", 5))
 ADMIN_ID = int(os.getenv("ADMIN_ID"))
 WEBHOOK_URL = os.getenv("WEBHOOK_URL")
 WEBHOOK_PATH = "/webhook"
 WEBAPP_HOST = "0.0.0.0"
 WEBAPP_PORT = int(os.getenv("PORT", 8080))
+# Адрес Bot API (можно подменить локальным сервером, например для нагрузочных тестов)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL")
+USE_UVLOOP = os.getenv("USE_UVLOOP", "1") == "1"
+# Сколько секунд ждать завершения обработки апдейтов при остановке
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", 30))
 
 # Преобразуем GOOGLE_SHEETS_CREDENTIALS из строки в словарь (если нужно)
 try:
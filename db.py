@@ -1,14 +1,60 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
 import asyncpg
-from config import DATABASE_URL
+from config import (DATABASE_URL, DATABASE_REPLICA_URL, REPLICA_STICKY_SECONDS, DB_POOL_MIN_SIZE,
+                    DB_POOL_MAX_SIZE, DB_STATEMENT_CACHE_SIZE, DB_MAX_INACTIVE_LIFETIME, DB_PGBOUNCER)
 
 # Глобальная переменная для пула соединений
 pool = None
+# Пул реплики только для чтения (None, если реплика не настроена или недоступна)
+replica_pool = None
+# user_id -> момент, до которого чтения этого пользователя идут в основной пул
+_recent_writers = {}
 
-async def create_pool():
+def pool_options():
+    options = {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+        'max_inactive_connection_lifetime': DB_MAX_INACTIVE_LIFETIME,
+    }
+    if DB_PGBOUNCER:
+        # PgBouncer в режиме transaction не сохраняет именованные prepared statements
+        # между транзакциями, поэтому кеш выключаем и asyncpg использует безымянные
+        options['statement_cache_size'] = 0
+    return options
+
+async def create_pool(**kwargs):
     global pool
-    pool = await asyncpg.create_pool(DATABASE_URL)
+    options = pool_options()
+    options.update(kwargs)
+    pool = await asyncpg.create_pool(DATABASE_URL, **options)
     return pool
 
+async def create_replica_pool(**kwargs):
+    global replica_pool
+    if not DATABASE_REPLICA_URL:
+        return None
+    options = pool_options()
+    options.update(kwargs)
+    try:
+        replica_pool = await asyncpg.create_pool(DATABASE_REPLICA_URL, **options)
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+        logging.warning(f"Реплика недоступна, чтение пойдёт в основную БД: {e}")
+        replica_pool = None
+    return replica_pool
+
+async def close_pool():
+    global pool, replica_pool
+    if replica_pool is not None:
+        await replica_pool.close()
+        replica_pool = None
+    if pool is not None:
+        await pool.close()
+        pool = None
+
 def get_pool():
     """Возвращает текущий пул соединений. Если пул не инициализирован, вызывает исключение."""
     global pool
@@ -16,6 +62,117 @@ def get_pool():
         raise RuntimeError("Database pool not initialized. Call create_pool() first.")
     return pool
 
+def mark_write(*user_ids):
+    """Запоминает, что пользователи только что изменили данные: их чтения какое-то время идут в основную БД."""
+    if replica_pool is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writers) > 10000:
+        for user_id, until in list(_recent_writers.items()):
+            if until <= now:
+                del _recent_writers[user_id]
+    for user_id in user_ids:
+        _recent_writers[user_id] = now + REPLICA_STICKY_SECONDS
+
+def get_read_pool(user_id=None):
+    """Пул для запросов только на чтение: реплика, если она есть и пользователь недавно ничего не менял."""
+    if replica_pool is None:
+        return get_pool()
+    if user_id is not None:
+        until = _recent_writers.get(user_id)
+        if until is not None:
+            if until > time.monotonic():
+                return get_pool()
+            del _recent_writers[user_id]
+    return replica_pool
+
+@asynccontextmanager
+async def acquire_read(user_id=None):
+    read_pool = get_read_pool(user_id)
+    try:
+        conn = await read_pool.acquire()
+    except (OSError, asyncio.TimeoutError, asyncpg.PostgresError) as e:
+        if read_pool is pool:
+            raise
+        logging.warning(f"Реплика недоступна, читаем из основной БД: {e}")
+        read_pool = get_pool()
+        conn = await read_pool.acquire()
+    try:
+        yield conn
+    finally:
+        await read_pool.release(conn)
+
+# Все созданные BatchWriter: запускаются при старте приложения и сбрасываются при остановке
+batch_writers = []
+
+class BatchWriter:
+    """Копит записи в памяти и сбрасывает их в БД пачками из одной фоновой задачи.
+
+    flush_items(conn, items) пишет пачку одним запросом. Сброс происходит раз в
+    interval секунд или раньше, если набралось max_batch записей. Если запись не
+    удалась, пачка возвращается в очередь и повторяется при следующем сбросе.
+    """
+
+    def __init__(self, name, flush_items, interval, max_batch=1000, max_pending=100_000):
+        self.name = name
+        self.flush_items = flush_items
+        self.interval = interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.items = []
+        self._wakeup = asyncio.Event()
+        # Одновременно пишется только одна пачка: flush() возвращается, когда записано всё, что было в очереди
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        self._task = None
+        batch_writers.append(self)
+
+    def add(self, item):
+        self.items.append(item)
+        if len(self.items) >= self.max_batch:
+            self._wakeup.set()
+
+    async def flush(self):
+        async with self._lock:
+            if not self.items:
+                return
+            items, self.items = self.items, []
+            try:
+                async with get_pool().acquire() as conn:
+                    await self.flush_items(conn, items)
+            except BaseException as e:
+                # Пачка возвращается в очередь и при ошибке БД, и при отмене посреди записи
+                self.items[:0] = items
+                if len(self.items) > self.max_pending:
+                    dropped = len(self.items) - self.max_pending
+                    del self.items[:dropped]
+                    logging.error(f"Очередь {self.name} переполнена, отброшено {dropped} записей")
+                if not isinstance(e, Exception):
+                    raise
+                logging.exception(f"Не удалось записать пачку {self.name} ({len(items)} записей)")
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        # Не отменяем задачу посреди записи: она допишет текущую пачку и выйдет из цикла
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
 async def init_db(pool):
     async with pool.acquire() as conn:
         # Таблица комнат
@@ -57,3 +214,453 @@ async def init_db(pool):
                 UNIQUE(category, value)
             )
         ''')
+        # Колоды: пул хранит карты нескольких колод, у комнаты своя колода
+        await conn.execute("ALTER TABLE pool ADD COLUMN IF NOT EXISTS deck TEXT NOT NULL DEFAULT 'base'")
+        await conn.execute("ALTER TABLE pool DROP CONSTRAINT IF EXISTS pool_category_value_key")
+        await conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS pool_deck_category_value_idx ON pool (deck, category, value)")
+        await conn.execute("ALTER TABLE rooms ADD COLUMN IF NOT EXISTS deck TEXT NOT NULL DEFAULT 'base'")
+        # Вес (редкость) карты для взвешенной раздачи
+        await conn.execute("ALTER TABLE pool ADD COLUMN IF NOT EXISTS weight REAL NOT NULL DEFAULT 1")
+        # Голосования
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS vote_rounds (
+                id SERIAL PRIMARY KEY,
+                room_code TEXT,
+                started_at TIMESTAMP DEFAULT NOW(),
+                closed_at TIMESTAMP
+            )
+        ''')
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS votes (
+                round_id INTEGER REFERENCES vote_rounds(id) ON DELETE CASCADE,
+                voter_id BIGINT,
+                target_id BIGINT,
+                voted_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (round_id, voter_id)
+            )
+        ''')
+        # Таймеры раундов (переживают перезапуск бота)
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS room_timers (
+                id SERIAL PRIMARY KEY,
+                room_code TEXT,
+                duration INTEGER,
+                ends_at TIMESTAMPTZ
+            )
+        ''')
+        # Журнал игровых событий (только добавление)
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS game_events (
+                id BIGSERIAL PRIMARY KEY,
+                room_code TEXT,
+                kind TEXT,
+                actor_id BIGINT,
+                payload JSONB,
+                created_at TIMESTAMPTZ DEFAULT NOW()
+            )
+        ''')
+        await conn.execute("CREATE INDEX IF NOT EXISTS game_events_room_idx ON game_events (room_code, id)")
+        # Архив закрытых игр: основные таблицы остаются маленькими
+        await conn.execute("ALTER TABLE rooms ADD COLUMN IF NOT EXISTS closed_at TIMESTAMP")
+        await conn.execute("CREATE INDEX IF NOT EXISTS rooms_active_idx ON rooms (code) WHERE is_active")
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS rooms_archive (
+                code TEXT,
+                deck TEXT,
+                created_at TIMESTAMP,
+                closed_at TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT NOW()
+            )
+        ''')
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS players_archive (
+                closed_at TIMESTAMP,
+                user_id BIGINT,
+                room_code TEXT,
+                username TEXT,
+                name TEXT,
+                bio TEXT,
+                prof TEXT,
+                health TEXT,
+                hobby TEXT,
+                luggage1 TEXT,
+                luggage2 TEXT,
+                fact TEXT,
+                special1 TEXT,
+                special2 TEXT,
+                used_special1 BOOLEAN,
+                used_special2 BOOLEAN,
+                revealed TEXT[]
+            )
+        ''')
+        await conn.execute("CREATE INDEX IF NOT EXISTS players_archive_room_idx ON players_archive (room_code, closed_at)")
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS game_events_archive (
+                id BIGINT,
+                room_code TEXT,
+                kind TEXT,
+                actor_id BIGINT,
+                payload JSONB,
+                created_at TIMESTAMPTZ
+            )
+        ''')
+        await conn.execute("CREATE INDEX IF NOT EXISTS game_events_archive_room_idx ON game_events_archive (room_code, id)")
+        # Код комнаты после архивации можно занять снова, поэтому игру в архиве различает пара (код, closed_at)
+        await conn.execute("ALTER TABLE game_events_archive ADD COLUMN IF NOT EXISTS closed_at TIMESTAMP")
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS vote_rounds_archive (
+                id INTEGER,
+                room_code TEXT,
+                closed_at TIMESTAMP,
+                started_at TIMESTAMP,
+                round_closed_at TIMESTAMP
+            )
+        ''')
+        await conn.execute("CREATE INDEX IF NOT EXISTS vote_rounds_archive_room_idx ON vote_rounds_archive (room_code, closed_at)")
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS votes_archive (
+                round_id INTEGER,
+                voter_id BIGINT,
+                target_id BIGINT,
+                voted_at TIMESTAMP
+            )
+        ''')
+        await conn.execute("CREATE INDEX IF NOT EXISTS votes_archive_round_idx ON votes_archive (round_id)")
+        # Правила совместимости карт колоды
+        await conn.execute('''
+            CREATE TABLE IF NOT EXISTS deck_rules (
+                deck TEXT,
+                kind TEXT,
+                category1 TEXT,
+                value1 TEXT,
+                category2 TEXT,
+                value2 TEXT
+            )
+        ''')
+        await conn.execute("CREATE INDEX IF NOT EXISTS deck_rules_deck_idx ON deck_rules (deck)")
+
+# ---------------------------------------------------------------------------
+# Запросы. Набор текстов фиксирован, поэтому каждый из них один раз
+# подготавливается на соединении и дальше берётся из кеша prepared statements
+# asyncpg. Колонки категорий подставляются только из белого списка.
+# ---------------------------------------------------------------------------
+
+# Категории карточки, хранящиеся в одной колонке (багаж и особые условия - в двух)
+CATEGORY_COLUMNS = ('bio', 'prof', 'health', 'hobby', 'fact')
+CARD_COLUMNS = ('bio', 'prof', 'health', 'hobby', 'luggage1', 'luggage2', 'fact', 'special1', 'special2')
+
+QUERIES = {
+    'active_room': "SELECT code FROM rooms WHERE is_active = TRUE",
+    'room_by_code': "SELECT * FROM rooms WHERE code = $1 AND is_active = TRUE",
+    'insert_room': "INSERT INTO rooms (code, deck) VALUES ($1, $2)",
+    'room_deck': "SELECT deck FROM rooms WHERE code = $1",
+    'deactivate_room': "UPDATE rooms SET is_active = FALSE, closed_at = NOW() WHERE code = $1 RETURNING closed_at",
+    'archive_room_players': '''
+        INSERT INTO players_archive (closed_at, user_id, room_code, username, name, bio, prof, health, hobby, luggage1, luggage2, fact, special1, special2, used_special1, used_special2, revealed)
+        SELECT $2, user_id, room_code, username, name, bio, prof, health, hobby, luggage1, luggage2, fact, special1, special2, used_special1, used_special2, revealed FROM players WHERE room_code = $1
+    ''',
+    'player': "SELECT * FROM players WHERE user_id = $1",
+    'player_in_room': "SELECT user_id FROM players WHERE user_id = $1 AND room_code = $2",
+    'player_room': "SELECT room_code FROM players WHERE user_id = $1",
+    'player_by_name': "SELECT user_id, name FROM players WHERE room_code = $1 AND name = $2",
+    'player_luggage': "SELECT luggage1, luggage2 FROM players WHERE user_id = $1",
+    'insert_player': '''
+        INSERT INTO players
+        (user_id, room_code, username, name, bio, prof, health, hobby, luggage1, luggage2, fact, special1, special2)
+        VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+    ''',
+    'delete_player': "DELETE FROM players WHERE user_id = $1",
+    'delete_room_players': "DELETE FROM players WHERE room_code = $1",
+    'room_cards': f"SELECT {', '.join(CARD_COLUMNS)} FROM players WHERE room_code = $1",
+    'room_roster': "SELECT name, username FROM players WHERE room_code = $1",
+    'room_members': "SELECT user_id, name FROM players WHERE room_code = $1 ORDER BY name",
+    'room_revealed': "SELECT name, bio, prof, health, hobby, luggage1, luggage2, fact, revealed FROM players WHERE room_code = $1",
+    'room_players_for_update': f"""
+        SELECT user_id, name, {', '.join(CARD_COLUMNS)} FROM players
+        WHERE room_code = $1 ORDER BY user_id FOR UPDATE
+    """,
+    # Раздача всей комнате одним запросом: NULL в колонке означает «оставить как есть»
+    'deal_cards': f'''
+        UPDATE players AS p SET
+            {', '.join(f"{c} = COALESCE(d.{c}, p.{c})" for c in CARD_COLUMNS)},
+            used_special1 = CASE WHEN $12 OR d.special1 IS NOT NULL THEN FALSE ELSE p.used_special1 END,
+            used_special2 = CASE WHEN $12 OR d.special2 IS NOT NULL THEN FALSE ELSE p.used_special2 END,
+            revealed = CASE WHEN $12 THEN '{{}}'::TEXT[] ELSE p.revealed END
+        FROM unnest($1::BIGINT[], {', '.join(f"${i}::TEXT[]" for i in range(2, 2 + len(CARD_COLUMNS)))})
+            AS d(user_id, {', '.join(CARD_COLUMNS)})
+        WHERE p.user_id = d.user_id AND p.room_code = $11
+    ''',
+    'room_luggage': "SELECT user_id, luggage1, luggage2 FROM players WHERE room_code = $1",
+    'room_luggage_except': "SELECT luggage1, luggage2 FROM players WHERE room_code = $1 AND user_id != $2",
+    'update_luggage': "UPDATE players SET luggage1 = $1, luggage2 = $2 WHERE user_id = $3",
+    'reveal_category': "UPDATE players SET revealed = array_append(revealed, $1) WHERE room_code = $2 AND name = $3 AND NOT ($1 = ANY(revealed))",
+    'insert_vote_round': "INSERT INTO vote_rounds (room_code) VALUES ($1) RETURNING id",
+    'close_vote_round': "UPDATE vote_rounds SET closed_at = NOW() WHERE id = $1",
+    'upsert_votes': '''
+        INSERT INTO votes (round_id, voter_id, target_id, voted_at)
+        SELECT * FROM unnest($1::INTEGER[], $2::BIGINT[], $3::BIGINT[], $4::TIMESTAMP[])
+        ON CONFLICT (round_id, voter_id) DO UPDATE SET target_id = EXCLUDED.target_id, voted_at = EXCLUDED.voted_at
+    ''',
+    'insert_timer': "INSERT INTO room_timers (room_code, duration, ends_at) VALUES ($1, $2, $3) RETURNING id",
+    'delete_timer': "DELETE FROM room_timers WHERE id = $1",
+    'delete_room_timers': "DELETE FROM room_timers WHERE room_code = $1 RETURNING id",
+    'pending_timers': "SELECT id, room_code, duration, ends_at FROM room_timers",
+    'archive_closed_rooms': '''
+        WITH moved AS (
+            DELETE FROM rooms WHERE code IN (
+                SELECT code FROM rooms
+                WHERE is_active = FALSE AND (closed_at IS NULL OR closed_at < NOW() - make_interval(secs => $2))
+                ORDER BY closed_at NULLS FIRST
+                LIMIT $1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING code, deck, created_at, closed_at
+        )
+        INSERT INTO rooms_archive (code, deck, created_at, closed_at)
+        SELECT code, deck, created_at, closed_at FROM moved
+        RETURNING code, closed_at
+    ''',
+    # $1 - коды перенесённых комнат, $2 - их closed_at (ключ игры в архиве)
+    'archive_room_events': '''
+        WITH moved AS (
+            DELETE FROM game_events e USING unnest($1::TEXT[], $2::TIMESTAMP[]) AS r(code, closed_at)
+            WHERE e.room_code = r.code
+            RETURNING e.id, e.room_code, r.closed_at, e.kind, e.actor_id, e.payload, e.created_at
+        )
+        INSERT INTO game_events_archive (id, room_code, closed_at, kind, actor_id, payload, created_at)
+        SELECT id, room_code, closed_at, kind, actor_id, payload, created_at FROM moved
+    ''',
+    'archive_room_votes': '''
+        WITH moved AS (
+            DELETE FROM votes v USING vote_rounds r
+            WHERE v.round_id = r.id AND r.room_code = ANY($1::TEXT[])
+            RETURNING v.round_id, v.voter_id, v.target_id, v.voted_at
+        )
+        INSERT INTO votes_archive (round_id, voter_id, target_id, voted_at)
+        SELECT round_id, voter_id, target_id, voted_at FROM moved
+    ''',
+    'archive_room_vote_rounds': '''
+        WITH moved AS (
+            DELETE FROM vote_rounds v USING unnest($1::TEXT[], $2::TIMESTAMP[]) AS r(code, closed_at)
+            WHERE v.room_code = r.code
+            RETURNING v.id, v.room_code, r.closed_at, v.started_at, v.closed_at AS round_closed_at
+        )
+        INSERT INTO vote_rounds_archive (id, room_code, closed_at, started_at, round_closed_at)
+        SELECT id, room_code, closed_at, started_at, round_closed_at FROM moved
+    ''',
+    'delete_rooms_timers': "DELETE FROM room_timers WHERE room_code = ANY($1::TEXT[])",
+    'rooms_fingerprint': '''
+        SELECT r.code, md5(coalesce(string_agg(p::TEXT, ',' ORDER BY p.user_id), '')) AS digest
+        FROM rooms r LEFT JOIN players p ON p.room_code = r.code
+        WHERE r.is_active = TRUE
+        GROUP BY r.code ORDER BY r.code
+    ''',
+    'decks_fingerprint': "SELECT deck, count(*) AS cards, max(id) AS last_id FROM pool GROUP BY deck",
+    'clear_pool': "DELETE FROM pool WHERE deck = $1",
+    'deck_cards': "SELECT category, value, weight FROM pool WHERE deck = $1 ORDER BY id",
+    'clear_rules': "DELETE FROM deck_rules WHERE deck = $1",
+    'deck_rules': "SELECT kind, category1, value1, category2, value2 FROM deck_rules WHERE deck = $1",
+}
+
+# Варианты запросов по отдельной категории: конечный набор текстов на каждую колонку
+CATEGORY_QUERIES = {
+    'room_category': {c: f"SELECT user_id, {c} FROM players WHERE room_code = $1" for c in CATEGORY_COLUMNS},
+    'room_category_except': {
+        c: f"SELECT {c} FROM players WHERE room_code = $1 AND user_id != $2 AND {c} IS NOT NULL"
+        for c in CATEGORY_COLUMNS
+    },
+    'player_category': {c: f"SELECT {c} FROM players WHERE user_id = $1" for c in CATEGORY_COLUMNS},
+    'update_category': {c: f"UPDATE players SET {c} = $1 WHERE user_id = $2" for c in CATEGORY_COLUMNS},
+    'mark_special_used': {n: f"UPDATE players SET used_special{n} = TRUE WHERE user_id = $1" for n in (1, 2)},
+}
+
+def category_query(name, category):
+    """Возвращает текст запроса для категории из белого списка."""
+    try:
+        return CATEGORY_QUERIES[name][category]
+    except KeyError:
+        raise ValueError(f"Недопустимая категория для запроса {name}: {category!r}") from None
+
+async def fetch_active_room(conn):
+    return await conn.fetchval(QUERIES['active_room'])
+
+async def fetch_room(conn, code):
+    return await conn.fetchrow(QUERIES['room_by_code'], code)
+
+async def create_room(conn, code, deck):
+    await conn.execute(QUERIES['insert_room'], code, deck)
+
+async def fetch_room_deck(conn, code):
+    return await conn.fetchval(QUERIES['room_deck'], code)
+
+async def close_room(conn, code):
+    """Закрывает комнату: карточки игроков уходят в архив, сами игроки удаляются."""
+    async with conn.transaction():
+        closed_at = await conn.fetchval(QUERIES['deactivate_room'], code)
+        await conn.execute(QUERIES['archive_room_players'], code, closed_at)
+        await conn.execute(QUERIES['delete_room_players'], code)
+
+async def fetch_player(conn, user_id):
+    return await conn.fetchrow(QUERIES['player'], user_id)
+
+async def is_player_in_room(conn, user_id, room_code):
+    return await conn.fetchval(QUERIES['player_in_room'], user_id, room_code) is not None
+
+async def fetch_player_room(conn, user_id):
+    return await conn.fetchval(QUERIES['player_room'], user_id)
+
+async def find_player_by_name(conn, room_code, name):
+    return await conn.fetchrow(QUERIES['player_by_name'], room_code, name)
+
+async def insert_player(conn, user_id, room_code, username, name, card):
+    await conn.execute(
+        QUERIES['insert_player'], user_id, room_code, username, name,
+        *(card[column] for column in CARD_COLUMNS)
+    )
+    mark_write(user_id)
+
+async def delete_player(conn, user_id):
+    await conn.execute(QUERIES['delete_player'], user_id)
+    mark_write(user_id)
+
+async def fetch_room_cards(conn, room_code):
+    return await conn.fetch(QUERIES['room_cards'], room_code)
+
+async def fetch_room_roster(conn, room_code):
+    return await conn.fetch(QUERIES['room_roster'], room_code)
+
+async def fetch_room_members(conn, room_code):
+    return await conn.fetch(QUERIES['room_members'], room_code)
+
+async def fetch_room_revealed(conn, room_code):
+    return await conn.fetch(QUERIES['room_revealed'], room_code)
+
+async def reveal_category(conn, room_code, name, category):
+    await conn.execute(QUERIES['reveal_category'], category, room_code, name)
+
+async def fetch_player_luggage(conn, user_id):
+    return await conn.fetchrow(QUERIES['player_luggage'], user_id)
+
+async def fetch_room_players_for_update(conn, room_code):
+    return await conn.fetch(QUERIES['room_players_for_update'], room_code)
+
+async def deal_cards(conn, room_code, user_ids, hands, new_game=False):
+    """Записывает раздачу всей комнате одним запросом.
+
+    hands - словари {колонка: карта} в порядке user_ids; отсутствующие колонки не меняются.
+    new_game сбрасывает раскрытую информацию и использованные особые условия.
+    """
+    columns = [[hand.get(column) for hand in hands] for column in CARD_COLUMNS]
+    await conn.execute(QUERIES['deal_cards'], user_ids, *columns, room_code, new_game)
+    mark_write(*user_ids)
+
+async def fetch_room_luggage(conn, room_code):
+    return await conn.fetch(QUERIES['room_luggage'], room_code)
+
+async def fetch_used_luggage(conn, room_code, except_user_id):
+    rows = await conn.fetch(QUERIES['room_luggage_except'], room_code, except_user_id)
+    return [value for r in rows for value in (r['luggage1'], r['luggage2']) if value]
+
+async def update_luggage(conn, user_id, luggage1, luggage2):
+    await conn.execute(QUERIES['update_luggage'], luggage1, luggage2, user_id)
+    mark_write(user_id)
+
+async def fetch_player_category(conn, user_id, category):
+    return await conn.fetchval(category_query('player_category', category), user_id)
+
+async def fetch_room_category(conn, room_code, category):
+    return await conn.fetch(category_query('room_category', category), room_code)
+
+async def fetch_used_category(conn, room_code, category, except_user_id):
+    rows = await conn.fetch(category_query('room_category_except', category), room_code, except_user_id)
+    return [r[category] for r in rows]
+
+async def update_category(conn, user_id, category, value):
+    await conn.execute(category_query('update_category', category), value, user_id)
+    mark_write(user_id)
+
+async def mark_special_used(conn, user_id, card_num):
+    await conn.execute(category_query('mark_special_used', card_num), user_id)
+    mark_write(user_id)
+
+async def create_vote_round(conn, room_code):
+    return await conn.fetchval(QUERIES['insert_vote_round'], room_code)
+
+async def close_vote_round(conn, round_id):
+    await conn.execute(QUERIES['close_vote_round'], round_id)
+
+async def upsert_votes(conn, votes):
+    """Пишет голоса (round_id, voter_id, target_id, voted_at) одним запросом. Пары (round_id, voter_id) не должны повторяться."""
+    round_ids, voter_ids, target_ids, voted_at = zip(*votes)
+    await conn.execute(QUERIES['upsert_votes'], list(round_ids), list(voter_ids), list(target_ids), list(voted_at))
+
+async def create_timer(conn, room_code, duration, ends_at):
+    return await conn.fetchval(QUERIES['insert_timer'], room_code, duration, ends_at)
+
+async def delete_timer(conn, timer_id):
+    await conn.execute(QUERIES['delete_timer'], timer_id)
+
+async def delete_room_timers(conn, room_code):
+    """Удаляет таймеры комнаты и возвращает их id."""
+    return [row['id'] for row in await conn.fetch(QUERIES['delete_room_timers'], room_code)]
+
+async def fetch_pending_timers(conn):
+    return await conn.fetch(QUERIES['pending_timers'])
+
+async def copy_events(conn, events):
+    """Пишет события (room_code, kind, actor_id, payload JSON, created_at) через COPY."""
+    await conn.copy_records_to_table(
+        'game_events', records=events,
+        columns=('room_code', 'kind', 'actor_id', 'payload', 'created_at')
+    )
+
+async def archive_closed_rooms(conn, limit, min_age):
+    """Переносит до limit комнат, закрытых больше min_age секунд назад, в архив вместе
+    с событиями и голосованиями; оставшиеся таймеры этих комнат удаляются.
+
+    Возвращает число перенесённых комнат.
+    """
+    async with conn.transaction():
+        rows = await conn.fetch(QUERIES['archive_closed_rooms'], limit, float(min_age))
+        if rows:
+            codes = [row['code'] for row in rows]
+            closed_at = [row['closed_at'] for row in rows]
+            await conn.execute(QUERIES['archive_room_events'], codes, closed_at)
+            # Голоса раньше раундов: иначе их удалит ON DELETE CASCADE
+            await conn.execute(QUERIES['archive_room_votes'], codes)
+            await conn.execute(QUERIES['archive_room_vote_rounds'], codes, closed_at)
+            await conn.execute(QUERIES['delete_rooms_timers'], codes)
+    return len(rows)
+
+async def fetch_rooms_fingerprint(conn):
+    """Пары [код, хеш карточек игроков] активных комнат: меняются при любом изменении комнаты."""
+    return [[row['code'], row['digest']] for row in await conn.fetch(QUERIES['rooms_fingerprint'])]
+
+async def fetch_decks_fingerprint(conn):
+    """{колода: [число карт, последний id]}: меняется при каждой синхронизации колоды."""
+    return {row['deck']: [row['cards'], row['last_id']] for row in await conn.fetch(QUERIES['decks_fingerprint'])}
+
+async def clear_pool(conn, deck):
+    await conn.execute(QUERIES['clear_pool'], deck)
+
+async def copy_pool_values(conn, deck, records):
+    """Пишет тройки (категория, значение, вес) колоды через COPY. Значения должны быть уже без дублей."""
+    await conn.copy_records_to_table(
+        'pool', records=[(deck, cat, val, weight) for cat, val, weight in records],
+        columns=('deck', 'category', 'value', 'weight')
+    )
+
+async def fetch_deck_cards(conn, deck):
+    return await conn.fetch(QUERIES['deck_cards'], deck)
+
+async def replace_rules(conn, deck, rules):
+    """Заменяет правила колоды пятёрками (тип, категория1, карта1, категория2, карта2)."""
+    await conn.execute(QUERIES['clear_rules'], deck)
+    if rules:
+        await conn.copy_records_to_table(
+            'deck_rules', records=[(deck, *rule) for rule in rules],
+            columns=('deck', 'kind', 'category1', 'value1', 'category2', 'value2')
+        )
+
+async def fetch_deck_rules(conn, deck):
+    return [tuple(row) for row in await conn.fetch(QUERIES['deck_rules'], deck)]
@@ -0,0 +1,221 @@
+import asyncio
+import csv
+import json
+import logging
+import mmap
+import os
+from config import SPREADSHEET_ID, DECKS, DECK_RULES, DECK_SOURCE, DECK_DIR
+import google_sheets
+
+# Колонки колоды: Биология, Профессия, Здоровье, Хобби, Багаж1, Багаж2, Факт, Особое условие1, Особое условие2
+COLUMN_CATEGORIES = ('bio', 'prof', 'health', 'hobby', 'luggage', 'luggage', 'fact', 'special', 'special')
+# Вес (редкость) задаётся у каждой карты отдельно: «Хирург | редкая» или «Хирург | 0.3»
+WEIGHT_SEPARATOR = '|'
+RARITY_WEIGHTS = {
+    'обычная': 1.0,
+    'необычная': 0.6,
+    'редкая': 0.3,
+    'легендарная': 0.1,
+}
+# Сколько строк файла разбирать за один шаг
+FILE_PAGE_ROWS = 5000
+# Правила совместимости: строка «тип, категория1, карта1, категория2, карта2».
+# exclude - карты не должны попасть одному игроку, synergy - вторую карту стоит давать вместе с первой
+RULE_KINDS = {
+    'exclude': 'exclude', 'исключение': 'exclude', 'несовместимо': 'exclude',
+    'synergy': 'synergy', 'синергия': 'synergy',
+}
+RULE_CATEGORIES = {
+    'биология': 'bio', 'профессия': 'prof', 'здоровье': 'health', 'хобби': 'hobby',
+    'багаж': 'luggage', 'факт': 'fact', 'особое условие': 'special',
+    **{cat: cat for cat in COLUMN_CATEGORIES},
+}
+
+def parse_weight(cell, default=1.0):
+    """Вес карты: число больше нуля или название редкости. Пустая или неверная ячейка - default."""
+    if cell is None or cell == "":
+        return default
+    if isinstance(cell, str):
+        cell = cell.strip().lower()
+        if cell in RARITY_WEIGHTS:
+            return RARITY_WEIGHTS[cell]
+        cell = cell.replace(',', '.')
+    try:
+        weight = float(cell)
+    except (TypeError, ValueError):
+        return default
+    return weight if weight > 0 else default
+
+def parse_card(cell, weight=1.0):
+    """Значение и вес карты из ячейки «значение» или «значение | вес».
+
+    Если после последнего «|» стоит не вес, вся ячейка считается текстом карты.
+    """
+    if not isinstance(cell, str):
+        return cell, weight
+    value, separator, suffix = cell.rpartition(WEIGHT_SEPARATOR)
+    if separator:
+        own_weight = parse_weight(suffix, None)
+        if own_weight is not None:
+            return value.strip(), own_weight
+    return cell, weight
+
+def row_cards(row):
+    """Тройки (категория, значение, вес) одной строки колоды."""
+    for cat, cell in zip(COLUMN_CATEGORIES, row):
+        yield (cat, *parse_card(cell))
+
+def parse_rule(row):
+    """Правило (тип, категория1, карта1, категория2, карта2) из строки или None, если строка неверная."""
+    if len(row) < 5:
+        return None
+    kind, cat1, value1, cat2, value2 = (str(cell).strip() for cell in row[:5])
+    kind = RULE_KINDS.get(kind.lower())
+    cat1 = RULE_CATEGORIES.get(cat1.lower())
+    cat2 = RULE_CATEGORIES.get(cat2.lower())
+    if kind is None or cat1 is None or cat2 is None or not value1 or not value2:
+        return None
+    return kind, cat1, value1, cat2, value2
+
+def collect_rules(rows):
+    return [rule for rule in map(parse_rule, rows) if rule is not None]
+
+async def collect_cards(pages, on_batch=None):
+    """Собирает словарь категорий {категория: {значение: вес}} из порций троек (категория, значение, вес).
+
+    Значения нормализуются и очищаются от дублей за один проход. У дубля остаётся
+    вес первого вхождения, а дубли с другим весом попадают в предупреждение в логе.
+    Если передан on_batch, он получает каждую порцию новых карт сразу, не дожидаясь
+    конца источника.
+    """
+    # dict сохраняет порядок колоды и заодно хранит веса
+    seen = {cat: {} for cat in COLUMN_CATEGORIES}
+    conflicts = []
+    async for cards in pages:
+        batch = []
+        for cat, value, weight in cards:
+            value = value.strip() if isinstance(value, str) else ""
+            if not value or cat not in seen:
+                continue
+            if value not in seen[cat]:
+                seen[cat][value] = weight
+                batch.append((cat, value, weight))
+            elif seen[cat][value] != weight:
+                conflicts.append(value)
+        if batch and on_batch is not None:
+            await on_batch(batch)
+    if conflicts:
+        logging.warning(f"Карты с разным весом в разных строках ({len(conflicts)}), оставлен вес "
+                        f"первого вхождения: {', '.join(conflicts[:10])}")
+    return seen
+
+class DeckSource:
+    """Источник колод: выдаёт карты колоды порциями троек (категория, значение, вес)."""
+
+    def iter_pages(self, deck):
+        raise NotImplementedError
+
+    async def load(self, deck, on_batch=None):
+        return await collect_cards(self.iter_pages(deck), on_batch)
+
+    async def load_rules(self, deck):
+        """Правила совместимости колоды; у колоды без правил - пустой список."""
+        return []
+
+class SheetsSource(DeckSource):
+    """Колода - лист Google-таблицы SPREADSHEET_ID."""
+
+    async def iter_pages(self, deck):
+        async for rows in google_sheets.iter_row_pages(SPREADSHEET_ID, DECKS[deck]):
+            yield [card for row in rows for card in row_cards(row)]
+
+    async def load_rules(self, deck):
+        if deck not in DECK_RULES:
+            return []
+        return collect_rules(await google_sheets.fetch_rows(SPREADSHEET_ID, f"{DECK_RULES[deck]}!A2:E"))
+
+class FileSource(DeckSource):
+    """Колода - локальный файл <каталог>/<колода>.csv или .jsonl.
+
+    CSV повторяет лист таблицы: строка заголовков и девять колонок, вес карты - в её
+    ячейке после «|». В JSON Lines каждая строка - либо массив из тех же ячеек, либо
+    объект {"категория": значение или список значений, "weight": вес}, где weight -
+    вес по умолчанию для значений объекта без своего «| вес».
+    Файл читается через mmap построчно, поэтому целиком в памяти не держится.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, deck):
+        for ext in ('.csv', '.jsonl'):
+            path = os.path.join(self.directory, deck + ext)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"Файл колоды {deck} не найден в {self.directory}")
+
+    async def load_rules(self, deck):
+        # Правила лежат рядом с колодой в <колода>.rules.csv (строка заголовков и пять колонок)
+        path = os.path.join(self.directory, deck + '.rules.csv')
+        if not os.path.exists(path):
+            return []
+        return await asyncio.to_thread(read_rules_file, path)
+
+    async def iter_pages(self, deck):
+        pages = iter_file_pages(self.path(deck))
+        # Разбор блокирующий, поэтому каждую порцию готовим в отдельном потоке
+        while True:
+            page = await asyncio.to_thread(next, pages, None)
+            if page is None:
+                return
+            yield page
+
+def iter_mmap_lines(path):
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b""):
+                yield line.decode('utf-8-sig')
+
+def read_rules_file(path):
+    rows = csv.reader(iter_mmap_lines(path))
+    next(rows, None)  # заголовки
+    return collect_rules(rows)
+
+def iter_file_cards(path):
+    lines = iter_mmap_lines(path)
+    if path.endswith('.csv'):
+        rows = csv.reader(lines)
+        next(rows, None)  # заголовки
+        for row in rows:
+            yield from row_cards(row)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        if isinstance(item, list):
+            yield from row_cards(item)
+            continue
+        weight = parse_weight(item.pop('weight', None))
+        for cat, value in item.items():
+            for v in (value if isinstance(value, list) else [value]):
+                yield (cat, *parse_card(v, weight))
+
+def iter_file_pages(path):
+    page = []
+    for card in iter_file_cards(path):
+        page.append(card)
+        if len(page) >= FILE_PAGE_ROWS * len(COLUMN_CATEGORIES):
+            yield page
+            page = []
+    if page:
+        yield page
+
+def get_source():
+    if DECK_SOURCE == "files":
+        return FileSource(DECK_DIR)
+    if DECK_SOURCE == "sheets":
+        return SheetsSource()
+    raise ValueError(f"Неизвестный источник колод: {DECK_SOURCE}")
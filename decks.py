@@ -0,0 +1,265 @@
+import asyncio
+import logging
+import random
+import sys
+from collections import OrderedDict
+from config import DECKS, DEFAULT_DECK, DECK_CACHE_MAX_BYTES
+import db
+from deck_sources import get_source
+from utils import WeightedPool
+
+CATEGORIES = ('bio', 'prof', 'health', 'hobby', 'luggage', 'fact', 'special')
+# Колонки карточки игрока, в которые попадают карты категории
+CARD_SLOTS = {
+    'bio': ('bio',), 'prof': ('prof',), 'health': ('health',), 'hobby': ('hobby',),
+    'luggage': ('luggage1', 'luggage2'), 'fact': ('fact',), 'special': ('special1', 'special2'),
+}
+# С какой вероятностью карта берётся из подходящих по правилу synergy, если такие есть
+SYNERGY_CHANCE = 0.5
+
+class Deck:
+    """Карты одной колоды, разложенные по категориям.
+
+    categories - {категория: список значений} или {категория: {значение: вес}}.
+    rules - правила совместимости (тип, категория1, карта1, категория2, карта2).
+    Таблицы для взвешенного выбора и битовые маски правил строятся один раз
+    при создании колоды, то есть только при её загрузке или перезагрузке.
+    """
+
+    def __init__(self, name, categories, rules=()):
+        self.name = name
+        self.rules = list(rules)
+        self.pools = {}
+        for cat in CATEGORIES:
+            values = categories.get(cat, [])
+            if isinstance(values, dict):
+                self.pools[cat] = WeightedPool(list(values), list(values.values()))
+            else:
+                self.pools[cat] = WeightedPool(list(values))
+        self.categories = {cat: pool.values for cat, pool in self.pools.items()}
+        # (категория, индекс карты) -> {категория: маска карт}; правила симметричны
+        self.excludes = {}
+        self.synergies = {}
+        self.compile_rules()
+        self.nbytes = estimate_size(self.pools) + estimate_rules_size(self.excludes, self.synergies)
+
+    def compile_rules(self):
+        skipped = 0
+        for kind, cat1, value1, cat2, value2 in self.rules:
+            pool1, pool2 = self.pools.get(cat1), self.pools.get(cat2)
+            i1 = pool1.index.get(value1) if pool1 else None
+            i2 = pool2.index.get(value2) if pool2 else None
+            if i1 is None or i2 is None:
+                skipped += 1
+                continue
+            target = self.excludes if kind == 'exclude' else self.synergies
+            for (cat, i), (other, j) in (((cat1, i1), (cat2, i2)), ((cat2, i2), (cat1, i1))):
+                masks = target.setdefault((cat, i), {})
+                masks[other] = masks.get(other, 0) | 1 << j
+        if skipped:
+            logging.warning(f"Колода {self.name}: пропущено правил с неизвестными картами: {skipped}")
+
+    def __getitem__(self, category):
+        return self.categories[category]
+
+    def draw(self, category, exclude, count=1):
+        """Случайные разные карты категории, которых нет в exclude, с учётом весов."""
+        return self.pools[category].sample(exclude, count)
+
+    def deal_hand(self, used, categories=CATEGORIES, keep=None):
+        """Собирает руку одного игрока: {колонка карточки: карта}.
+
+        used - {категория: занятые в комнате карты}. keep - текущая карточка игрока
+        {колонка: карта}: карты категорий, которые не пересдаются, остаются у него и
+        тоже ограничивают выбор по правилам. Без правил каждая категория тянется
+        независимо. С правилами запрещённые карты копятся в битовой маске категории,
+        так что выбор сразу идёт только среди совместимых карт.
+        """
+        if not self.excludes and not self.synergies:
+            hand = {}
+            for cat in categories:
+                slots = CARD_SLOTS[cat]
+                hand.update(zip(slots, self.draw(cat, used.get(cat, []), len(slots))))
+            return hand
+        forbidden = {cat: self.pools[cat].mask(used.get(cat, [])) for cat in categories}
+        boosts = {}
+        needs = {cat: len(CARD_SLOTS[cat]) for cat in categories}
+        if keep:
+            for cat, slots in CARD_SLOTS.items():
+                if cat in categories:
+                    continue
+                for slot in slots:
+                    i = self.pools[cat].index.get(keep.get(slot))
+                    if i is not None:
+                        self._apply_rules(cat, i, forbidden, boosts)
+        hand = {}
+        for cat in categories:
+            pool = self.pools[cat]
+            for slot in CARD_SLOTS[cat]:
+                while True:
+                    preferred = boosts.get(cat, 0) & ~forbidden[cat]
+                    if preferred and random.random() < SYNERGY_CHANCE:
+                        i = pool.choose_index(preferred)
+                    else:
+                        i = pool.draw_index(forbidden[cat])
+                    if self._leaves_enough(cat, i, forbidden, needs):
+                        break
+                    # Карта исключила бы все оставшиеся варианты другой категории руки:
+                    # убираем её из маски, draw_index бросит ValueError, когда выбирать станет не из чего
+                    forbidden[cat] |= 1 << i
+                hand[slot] = pool.values[i]
+                forbidden[cat] |= 1 << i
+                needs[cat] -= 1
+                self._apply_rules(cat, i, forbidden, boosts)
+        return hand
+
+    def _apply_rules(self, cat, i, forbidden, boosts):
+        """Добавляет запреты и предпочтения карты (cat, i) к маскам раздаваемых категорий."""
+        for other, mask in self.excludes.get((cat, i), {}).items():
+            if other in forbidden:
+                forbidden[other] |= mask
+        for other, mask in self.synergies.get((cat, i), {}).items():
+            boosts[other] = boosts.get(other, 0) | mask
+
+    def _leaves_enough(self, cat, i, forbidden, needs):
+        """Останется ли после карты (cat, i) достаточно совместимых карт в ещё не розданных слотах."""
+        for other, mask in self.excludes.get((cat, i), {}).items():
+            need = needs.get(other, 0) - (other == cat)
+            if need <= 0:
+                continue
+            blocked = forbidden[other] | mask | (1 << i if other == cat else 0)
+            if (self.pools[other].full_mask & ~blocked).bit_count() < need:
+                return False
+        return True
+
+    def deal(self, players, categories=CATEGORIES, keeps=None):
+        """Раздаёт players игрокам разные карты выбранных категорий.
+
+        keeps - текущие карточки игроков (по одной на игрока), если пересдаётся
+        только часть категорий. Возвращает по словарю {колонка карточки: карта} на игрока.
+        """
+        if self.excludes or self.synergies:
+            # С правилами руки собираются по одной, чтобы учесть сочетания карт внутри руки
+            used = {cat: [] for cat in categories}
+            hands = []
+            for n in range(players):
+                hand = self.deal_hand(used, categories, keeps[n] if keeps else None)
+                for cat in categories:
+                    used[cat].extend(hand[slot] for slot in CARD_SLOTS[cat])
+                hands.append(hand)
+            return hands
+        hands = [{} for _ in range(players)]
+        for cat in categories:
+            slots = CARD_SLOTS[cat]
+            cards = iter(self.draw(cat, [], players * len(slots)))
+            for hand in hands:
+                for slot in slots:
+                    hand[slot] = next(cards)
+        return hands
+
+def estimate_size(pools):
+    """Оценка памяти колоды: строки, списки весов, индекс и таблицы псевдонимов."""
+    size = sys.getsizeof(pools)
+    for pool in pools.values():
+        size += sum(sys.getsizeof(v) for v in pool.values)
+        size += sys.getsizeof(pool.values) + sys.getsizeof(pool.index)
+        # weights, prob, alias: список плюс по числу на значение
+        size += 3 * (sys.getsizeof(pool.weights) + 24 * len(pool.values))
+    return size
+
+def estimate_rules_size(*indexes):
+    size = 0
+    for index in indexes:
+        size += sys.getsizeof(index)
+        for masks in index.values():
+            size += sys.getsizeof(masks) + sum(sys.getsizeof(m) for m in masks.values())
+    return size
+
+def used_cards(rows):
+    """Занятые карты комнаты по категориям из строк с колонками карточки."""
+    return {cat: [r[slot] for r in rows for slot in slots] for cat, slots in CARD_SLOTS.items()}
+
+class DeckCache:
+    """LRU-кеш колод с вытеснением по суммарному объёму памяти."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.decks = OrderedDict()
+        self.nbytes = 0
+
+    def __contains__(self, name):
+        # Проверка без отметки об использовании: порядок вытеснения не меняется
+        return name in self.decks
+
+    def get(self, name):
+        deck = self.decks.get(name)
+        if deck is not None:
+            self.decks.move_to_end(name)
+        return deck
+
+    def put(self, deck):
+        self.discard(deck.name)
+        self.decks[deck.name] = deck
+        self.nbytes += deck.nbytes
+        # Только что загруженную колоду не вытесняем, даже если она одна больше лимита
+        while self.nbytes > self.max_bytes and len(self.decks) > 1:
+            name, evicted = self.decks.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+            logging.info(f"Колода {name} вытеснена из кеша")
+
+    def discard(self, name):
+        deck = self.decks.pop(name, None)
+        if deck is not None:
+            self.nbytes -= deck.nbytes
+
+cache = DeckCache(DECK_CACHE_MAX_BYTES)
+# Не даём двум обработчикам одновременно грузить одну и ту же колоду
+_load_locks = {}
+
+def check_deck(name):
+    if name not in DECKS:
+        raise ValueError(f"Неизвестная колода «{name}». Доступны: {', '.join(DECKS)}")
+
+async def get_deck(name=DEFAULT_DECK):
+    """Возвращает колоду из кеша, при первом обращении загружая её из БД или таблицы."""
+    deck = cache.get(name)
+    if deck is not None:
+        return deck
+    check_deck(name)
+    async with _load_locks.setdefault(name, asyncio.Lock()):
+        deck = cache.get(name)
+        if deck is None:
+            deck = await load_deck(name)
+            cache.put(deck)
+    return deck
+
+async def sync_deck(conn, name):
+    """Перезаливает карты и правила колоды из источника в одной транзакции и возвращает колоду."""
+    source = get_source()
+    async with conn.transaction():
+        await db.clear_pool(conn, name)
+        categories = await source.load(name, on_batch=lambda batch: db.copy_pool_values(conn, name, batch))
+        rules = await source.load_rules(name)
+        await db.replace_rules(conn, name, rules)
+    return Deck(name, categories, rules)
+
+async def load_deck(name):
+    async with db.get_pool().acquire() as conn:
+        rows = await db.fetch_deck_cards(conn, name)
+        if not rows:
+            # Колода ещё ни разу не синхронизировалась
+            return await sync_deck(conn, name)
+        rules = await db.fetch_deck_rules(conn, name)
+    categories = {}
+    for row in rows:
+        categories.setdefault(row['category'], {})[row['value']] = row['weight']
+    return Deck(name, categories, rules)
+
+async def reload_deck(name=DEFAULT_DECK):
+    """Перечитывает колоду из источника и заменяет её в кеше."""
+    check_deck(name)
+    async with _load_locks.setdefault(name, asyncio.Lock()):
+        async with db.get_pool().acquire() as conn:
+            deck = await sync_deck(conn, name)
+        cache.put(deck)
+    return deck
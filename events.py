@@ -0,0 +1,11 @@
+import json
+from datetime import datetime, timezone
+from config import EVENT_FLUSH_INTERVAL
+import db
+
+# Журнал игровых событий пишется в БД пачками через COPY, обработчик БД не ждёт
+writer = db.BatchWriter("game_events", db.copy_events, EVENT_FLUSH_INTERVAL)
+
+def log_event(room_code, kind, actor_id, **payload):
+    """Добавляет событие в очередь журнала. payload - любые JSON-сериализуемые подробности."""
+    writer.add((room_code, kind, actor_id, json.dumps(payload, ensure_ascii=False), datetime.now(timezone.utc)))
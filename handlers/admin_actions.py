@@ -1,36 +1,46 @@
 import logging
 from aiogram import Router, types, Bot
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 import asyncpg
 import random
-from config import ADMIN_ID, SPREADSHEET_ID
+from config import ADMIN_ID, DECKS, DEFAULT_DECK
+import db
+import decks
 from db import get_pool
-from google_sheets import load_from_sheets, update_pool
+from events import log_event
+from handlers.player import format_player_card
 from handlers.states import RandomChange, Swap, Shuffle, Change
-from utils import get_random_unique_values
-
-pool_cache = {}  # будет заполнено при /reload или при старте
+from utils import send_batch
 
 router = Router()
 
 @router.message(Command("reload"))
-async def cmd_reload(message: types.Message, bot: Bot):
+async def cmd_reload(message: types.Message, command: CommandObject, bot: Bot):
     if message.from_user.id != ADMIN_ID:
         return
-    await message.answer("🔄 Загрузка данных из Google Sheets...")
+    arg = command.args.strip() if command.args else DEFAULT_DECK
+    names = list(DECKS) if arg == "all" else [arg]
+    await message.answer(f"🔄 Загрузка колод: {', '.join(names)}...")
     try:
-        categories = await load_from_sheets(SPREADSHEET_ID)
-        pool = get_pool()
-        async with pool.acquire() as conn:
-            await update_pool(conn, categories)
-        global pool_cache
-        pool_cache = categories
+        for name in names:
+            await decks.reload_deck(name)
         await message.answer("✅ Данные успешно обновлены.")
     except Exception as e:
-        logging.exception("Ошибка при загрузке Google Sheets")
+        logging.exception("Ошибка при загрузке колоды")
         await message.answer(f"❌ Ошибка: {e}")
 
+@router.message(Command("decks"))
+async def cmd_decks(message: types.Message):
+    if message.from_user.id != ADMIN_ID:
+        return
+    lines = []
+    for name, sheet in DECKS.items():
+        loaded = " (загружена)" if name in decks.cache else ""
+        default = " - по умолчанию" if name == DEFAULT_DECK else ""
+        lines.append(f"• {name}: лист «{sheet}»{loaded}{default}")
+    await message.answer("🃏 Колоды:\n" + "\n".join(lines))
+
 @router.message(Command("cancel"))
 async def cmd_cancel(message: types.Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID:
@@ -48,12 +58,12 @@ async def cmd_random(message: types.Message, state: FSMContext, bot: Bot):
         return
     pool = get_pool()
     async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT code FROM rooms WHERE is_active = TRUE")
-        if not room:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
             await message.answer("❌ Нет активной комнаты.")
             return
     await state.set_state(RandomChange.choosing_player)
-    await state.update_data(room_code=room['code'])
+    await state.update_data(room_code=room_code)
     await message.answer("Введите имя игрока:")
 
 @router.message(RandomChange.choosing_player)
@@ -62,10 +72,7 @@ async def random_player(message: types.Message, state: FSMContext, bot: Bot):
     data = await state.get_data()
     name = message.text.strip()
     async with pool.acquire() as conn:
-        player = await conn.fetchrow(
-            "SELECT user_id, name FROM players WHERE room_code = $1 AND name = $2",
-            data['room_code'], name
-        )
+        player = await db.find_player_by_name(conn, data['room_code'], name)
         if not player:
             await message.answer("❌ Игрок с таким именем не найден. Попробуйте ещё раз или /cancel.")
             return
@@ -95,25 +102,27 @@ async def random_category(message: types.Message, state: FSMContext, bot: Bot):
 
     pool = get_pool()
     async with pool.acquire() as conn:
-        player = await conn.fetchrow("SELECT * FROM players WHERE user_id = $1", player_id)
+        deck_name = await db.fetch_room_deck(conn, room_code)
+    try:
+        deck = await decks.get_deck(deck_name or DEFAULT_DECK)
+    except Exception as e:
+        logging.exception("Не удалось загрузить колоду")
+        await message.answer(f"❌ Не удалось загрузить колоду: {e}")
+        await state.clear()
+        return
+
+    async with pool.acquire() as conn:
+        player = await db.fetch_player(conn, player_id)
         if not player:
             await message.answer("❌ Ошибка: игрок не найден.")
             await state.clear()
             return
 
         if db_cat == 'luggage':
-            rows = await conn.fetch(
-                "SELECT luggage1, luggage2 FROM players WHERE room_code = $1 AND user_id != $2",
-                room_code, player_id
-            )
-            used_vals = []
-            for r in rows:
-                if r['luggage1']:
-                    used_vals.append(r['luggage1'])
-                if r['luggage2']:
-                    used_vals.append(r['luggage2'])
+            used_vals = await db.fetch_used_luggage(conn, room_code, player_id)
             try:
-                new_vals = get_random_unique_values(pool_cache['luggage'], used_vals, 2)
+                hand = deck.deal_hand({'luggage': used_vals}, ('luggage',), keep=dict(player))
+                new_vals = [hand['luggage1'], hand['luggage2']]
             except ValueError as e:
                 await message.answer(f"❌ Недостаточно уникальных значений в пуле: {e}")
                 await state.clear()
@@ -121,10 +130,9 @@ async def random_category(message: types.Message, state: FSMContext, bot: Bot):
 
             old_l1 = player['luggage1']
             old_l2 = player['luggage2']
-            await conn.execute(
-                "UPDATE players SET luggage1 = $1, luggage2 = $2 WHERE user_id = $3",
-                new_vals[0], new_vals[1], player_id
-            )
+            await db.update_luggage(conn, player_id, new_vals[0], new_vals[1])
+            log_event(room_code, 'random', message.from_user.id, player_id=player_id, category=db_cat,
+                      old=[old_l1, old_l2], new=new_vals)
             await bot.send_message(
                 player_id,
                 f"🔄 Ваш багаж изменён администратором (случайно):\n"
@@ -136,23 +144,18 @@ async def random_category(message: types.Message, state: FSMContext, bot: Bot):
                 f"Новые значения: {new_vals[0]}, {new_vals[1]}"
             )
         else:
-            rows = await conn.fetch(
-                f"SELECT {db_cat} FROM players WHERE room_code = $1 AND user_id != $2 AND {db_cat} IS NOT NULL",
-                room_code, player_id
-            )
-            used_vals = [r[db_cat] for r in rows]
+            used_vals = await db.fetch_used_category(conn, room_code, db_cat, player_id)
             try:
-                new_val = get_random_unique_values(pool_cache[db_cat], used_vals, 1)[0]
+                new_val = deck.deal_hand({db_cat: used_vals}, (db_cat,), keep=dict(player))[db_cat]
             except ValueError as e:
                 await message.answer(f"❌ Недостаточно уникальных значений в пуле: {e}")
                 await state.clear()
                 return
 
             old_val = player[db_cat]
-            await conn.execute(
-                f"UPDATE players SET {db_cat} = $1 WHERE user_id = $2",
-                new_val, player_id
-            )
+            await db.update_category(conn, player_id, db_cat, new_val)
+            log_event(room_code, 'random', message.from_user.id, player_id=player_id, category=db_cat,
+                      old=old_val, new=new_val)
             await bot.send_message(
                 player_id,
                 f"🔄 Ваша категория «{cat}» изменена администратором (случайно):\n"
@@ -168,12 +171,12 @@ async def cmd_swap(message: types.Message, state: FSMContext, bot: Bot):
         return
     pool = get_pool()
     async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT code FROM rooms WHERE is_active = TRUE")
-        if not room:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
             await message.answer("❌ Нет активной комнаты.")
             return
     await state.set_state(Swap.choosing_player1)
-    await state.update_data(room_code=room['code'])
+    await state.update_data(room_code=room_code)
     await message.answer("Введите имя первого игрока:")
 
 @router.message(Swap.choosing_player1)
@@ -182,10 +185,7 @@ async def swap_player1(message: types.Message, state: FSMContext, bot: Bot):
     data = await state.get_data()
     name1 = message.text.strip()
     async with pool.acquire() as conn:
-        player1 = await conn.fetchrow(
-            "SELECT user_id, name FROM players WHERE room_code = $1 AND name = $2",
-            data['room_code'], name1
-        )
+        player1 = await db.find_player_by_name(conn, data['room_code'], name1)
         if not player1:
             await message.answer("❌ Игрок не найден. Попробуйте ещё раз.")
             return
@@ -202,10 +202,7 @@ async def swap_player2(message: types.Message, state: FSMContext, bot: Bot):
         await message.answer("❌ Игроки должны быть разными. Введите другое имя:")
         return
     async with pool.acquire() as conn:
-        player2 = await conn.fetchrow(
-            "SELECT user_id, name FROM players WHERE room_code = $1 AND name = $2",
-            data['room_code'], name2
-        )
+        player2 = await db.find_player_by_name(conn, data['room_code'], name2)
         if not player2:
             await message.answer("❌ Игрок не найден. Попробуйте ещё раз.")
             return
@@ -237,8 +234,8 @@ async def swap_category(message: types.Message, state: FSMContext, bot: Bot):
 
     pool = get_pool()
     async with pool.acquire() as conn:
-        p1 = await conn.fetchrow("SELECT * FROM players WHERE user_id = $1", p1_id)
-        p2 = await conn.fetchrow("SELECT * FROM players WHERE user_id = $2", p2_id)
+        p1 = await db.fetch_player(conn, p1_id)
+        p2 = await db.fetch_player(conn, p2_id)
         if not p1 or not p2:
             await message.answer("❌ Ошибка получения данных игроков.")
             await state.clear()
@@ -247,14 +244,11 @@ async def swap_category(message: types.Message, state: FSMContext, bot: Bot):
         if db_cat == 'luggage':
             old_p1_l1, old_p1_l2 = p1['luggage1'], p1['luggage2']
             old_p2_l1, old_p2_l2 = p2['luggage1'], p2['luggage2']
-            await conn.execute(
-                "UPDATE players SET luggage1 = $1, luggage2 = $2 WHERE user_id = $3",
-                old_p2_l1, old_p2_l2, p1_id
-            )
-            await conn.execute(
-                "UPDATE players SET luggage1 = $1, luggage2 = $2 WHERE user_id = $3",
-                old_p1_l1, old_p1_l2, p2_id
-            )
+            async with conn.transaction():
+                await db.update_luggage(conn, p1_id, old_p2_l1, old_p2_l2)
+                await db.update_luggage(conn, p2_id, old_p1_l1, old_p1_l2)
+            log_event(room_code, 'swap', message.from_user.id, players=[p1_id, p2_id], category=db_cat,
+                      values=[[old_p1_l1, old_p1_l2], [old_p2_l1, old_p2_l2]])
             await bot.send_message(
                 p1_id,
                 f"🔄 Ваш багаж обменян администратором с игроком {p2_name}:\n"
@@ -271,14 +265,11 @@ async def swap_category(message: types.Message, state: FSMContext, bot: Bot):
         else:
             old_p1_val = p1[db_cat]
             old_p2_val = p2[db_cat]
-            await conn.execute(
-                f"UPDATE players SET {db_cat} = $1 WHERE user_id = $2",
-                old_p2_val, p1_id
-            )
-            await conn.execute(
-                f"UPDATE players SET {db_cat} = $1 WHERE user_id = $2",
-                old_p1_val, p2_id
-            )
+            async with conn.transaction():
+                await db.update_category(conn, p1_id, db_cat, old_p2_val)
+                await db.update_category(conn, p2_id, db_cat, old_p1_val)
+            log_event(room_code, 'swap', message.from_user.id, players=[p1_id, p2_id], category=db_cat,
+                      values=[old_p1_val, old_p2_val])
             await bot.send_message(
                 p1_id,
                 f"🔄 Ваша категория «{cat}» обменяна администратором с игроком {p2_name}:\n"
@@ -300,12 +291,12 @@ async def cmd_shuffle(message: types.Message, state: FSMContext, bot: Bot):
         return
     pool = get_pool()
     async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT code FROM rooms WHERE is_active = TRUE")
-        if not room:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
             await message.answer("❌ Нет активной комнаты.")
             return
     await state.set_state(Shuffle.choosing_category)
-    await state.update_data(room_code=room['code'])
+    await state.update_data(room_code=room_code)
     await message.answer("Какую категорию перемешать?\n(Биология, Профессия, Здоровье, Хобби, Багаж, Факт)")
 
 @router.message(Shuffle.choosing_category)
@@ -329,10 +320,7 @@ async def shuffle_category(message: types.Message, state: FSMContext, bot: Bot):
     pool = get_pool()
     async with pool.acquire() as conn:
         if db_cat == 'luggage':
-            players = await conn.fetch(
-                "SELECT user_id FROM players WHERE room_code = $1",
-                room_code
-            )
+            players = await db.fetch_room_luggage(conn, room_code)
             if len(players) < 2:
                 await message.answer("❌ Недостаточно игроков для перемешивания.")
                 await state.clear()
@@ -341,25 +329,23 @@ async def shuffle_category(message: types.Message, state: FSMContext, bot: Bot):
             # Собираем все багажи
             all_luggage = []
             for p in players:
-                p_data = await conn.fetchrow("SELECT luggage1, luggage2 FROM players WHERE user_id = $1", p['user_id'])
-                all_luggage.append(p_data['luggage1'])
-                all_luggage.append(p_data['luggage2'])
+                all_luggage.append(p['luggage1'])
+                all_luggage.append(p['luggage2'])
             random.shuffle(all_luggage)
             # Раздаём по два
             for i, p in enumerate(players):
                 new_l1 = all_luggage[2*i]
                 new_l2 = all_luggage[2*i+1]
-                await conn.execute(
-                    "UPDATE players SET luggage1 = $1, luggage2 = $2 WHERE user_id = $3",
-                    new_l1, new_l2, p['user_id']
-                )
+                await db.update_luggage(conn, p['user_id'], new_l1, new_l2)
                 await bot.send_message(
                     p['user_id'],
                     f"🔄 Багаж перемешан администратором! Ваш новый багаж:\n{new_l1}, {new_l2}"
                 )
+            log_event(room_code, 'shuffle', message.from_user.id, category=db_cat,
+                      result={p['user_id']: all_luggage[2*i:2*i+2] for i, p in enumerate(players)})
             await message.answer("✅ Багаж всех игроков перемешан.")
         else:
-            rows = await conn.fetch(f"SELECT user_id, {db_cat} FROM players WHERE room_code = $1", room_code)
+            rows = await db.fetch_room_category(conn, room_code, db_cat)
             if len(rows) < 2:
                 await message.answer("❌ Недостаточно игроков для перемешивания.")
                 await state.clear()
@@ -368,11 +354,13 @@ async def shuffle_category(message: types.Message, state: FSMContext, bot: Bot):
             random.shuffle(all_vals)
             for i, row in enumerate(rows):
                 new_val = all_vals[i]
-                await conn.execute(f"UPDATE players SET {db_cat} = $1 WHERE user_id = $2", new_val, row['user_id'])
+                await db.update_category(conn, row['user_id'], db_cat, new_val)
                 await bot.send_message(
                     row['user_id'],
                     f"🔄 Категория «{cat}» перемешана администратором! Новое значение:\n{new_val}"
                 )
+            log_event(room_code, 'shuffle', message.from_user.id, category=db_cat,
+                      result={row['user_id']: all_vals[i] for i, row in enumerate(rows)})
             await message.answer(f"✅ {cat} всех игроков перемешана.")
     await state.clear()
 
@@ -382,12 +370,12 @@ async def cmd_change(message: types.Message, state: FSMContext, bot: Bot):
         return
     pool = get_pool()
     async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT code FROM rooms WHERE is_active = TRUE")
-        if not room:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
             await message.answer("❌ Нет активной комнаты.")
             return
     await state.set_state(Change.choosing_player)
-    await state.update_data(room_code=room['code'])
+    await state.update_data(room_code=room_code)
     await message.answer("Введите имя игрока:")
 
 @router.message(Change.choosing_player)
@@ -396,10 +384,7 @@ async def change_player(message: types.Message, state: FSMContext, bot: Bot):
     data = await state.get_data()
     name = message.text.strip()
     async with pool.acquire() as conn:
-        player = await conn.fetchrow(
-            "SELECT user_id, name FROM players WHERE room_code = $1 AND name = $2",
-            data['room_code'], name
-        )
+        player = await db.find_player_by_name(conn, data['room_code'], name)
         if not player:
             await message.answer("❌ Игрок не найден. Попробуйте ещё раз.")
             return
@@ -464,12 +449,11 @@ async def apply_change(message: types.Message, state: FSMContext, bot: Bot, new_
                     await message.answer("❌ Ошибка: второе значение багажа не найдено.")
                     await state.clear()
                     return
-            old = await conn.fetchrow("SELECT luggage1, luggage2 FROM players WHERE user_id = $1", player_id)
+            old = await db.fetch_player_luggage(conn, player_id)
             old_l1, old_l2 = old['luggage1'], old['luggage2']
-            await conn.execute(
-                "UPDATE players SET luggage1 = $1, luggage2 = $2 WHERE user_id = $3",
-                new_val1, new_val2, player_id
-            )
+            await db.update_luggage(conn, player_id, new_val1, new_val2)
+            log_event(data['room_code'], 'change', message.from_user.id, player_id=player_id, category=db_cat,
+                      old=[old_l1, old_l2], new=[new_val1, new_val2])
             await bot.send_message(
                 player_id,
                 f"🔄 Ваш багаж изменён администратором вручную:\n"
@@ -481,11 +465,10 @@ async def apply_change(message: types.Message, state: FSMContext, bot: Bot, new_
                 f"{new_val1}, {new_val2}"
             )
         else:
-            old = await conn.fetchval(f"SELECT {db_cat} FROM players WHERE user_id = $1", player_id)
-            await conn.execute(
-                f"UPDATE players SET {db_cat} = $1 WHERE user_id = $2",
-                new_val1, player_id
-            )
+            old = await db.fetch_player_category(conn, player_id, db_cat)
+            await db.update_category(conn, player_id, db_cat, new_val1)
+            log_event(data['room_code'], 'change', message.from_user.id, player_id=player_id, category=db_cat,
+                      old=old, new=new_val1)
             await bot.send_message(
                 player_id,
                 f"🔄 Ваша категория «{cat_ru}» изменена администратором вручную:\n"
@@ -508,3 +491,85 @@ async def change_new_value2(message: types.Message, state: FSMContext, bot: Bot)
         await state.clear()
         return
     await apply_change(message, state, bot, new_val1, new_val2)
+
+# Категории, которые можно пересдать всей комнате
+REROLL_CATEGORIES = {
+    "биология": "bio",
+    "профессия": "prof",
+    "здоровье": "health",
+    "хобби": "hobby",
+    "багаж": "luggage",
+    "факт": "fact",
+    "особое условие": "special",
+}
+
+async def deal_room(message: types.Message, bot: Bot, categories, cat_ru=None):
+    pool = get_pool()
+    async with pool.acquire() as conn:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
+            await message.answer("❌ Нет активной комнаты.")
+            return
+        deck_name = await db.fetch_room_deck(conn, room_code)
+    try:
+        deck = await decks.get_deck(deck_name or DEFAULT_DECK)
+    except Exception as e:
+        logging.exception("Не удалось загрузить колоду")
+        await message.answer(f"❌ Не удалось загрузить колоду: {e}")
+        return
+
+    new_game = cat_ru is None
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            players = await db.fetch_room_players_for_update(conn, room_code)
+            if not players:
+                await message.answer("❌ В комнате нет игроков.")
+                return
+            try:
+                # Непересдаваемые карты остаются у игроков, правила колоды учитывают и их
+                hands = deck.deal(len(players), categories, keeps=[dict(p) for p in players])
+            except ValueError as e:
+                await message.answer(f"❌ Недостаточно уникальных значений в пуле: {e}")
+                return
+            await db.deal_cards(conn, room_code, [p['user_id'] for p in players], hands, new_game)
+    log_event(room_code, 'deal' if new_game else 'reroll', message.from_user.id, categories=list(categories),
+              hands={p['user_id']: hand for p, hand in zip(players, hands)})
+
+    if new_game:
+        notifications = [
+            (p['user_id'], "🃏 Администратор раздал новые карты! Ваша карточка:\n"
+                           + format_player_card({'name': p['name'], **hand}))
+            for p, hand in zip(players, hands)
+        ]
+        await message.answer(f"✅ Карты розданы {len(players)} игрокам.")
+    else:
+        notifications = [
+            (p['user_id'], f"🔄 Категория «{cat_ru}» пересдана администратором! Новое значение:\n"
+                           + ", ".join(hand.values()))
+            for p, hand in zip(players, hands)
+        ]
+        await message.answer(f"✅ {cat_ru} пересдана всем игрокам ({len(players)}).")
+    await send_batch(bot, notifications)
+
+@router.message(Command("deal"))
+async def cmd_deal(message: types.Message, bot: Bot):
+    if message.from_user.id != ADMIN_ID:
+        return
+    await deal_room(message, bot, decks.CATEGORIES)
+
+@router.message(Command("reroll"))
+async def cmd_reroll(message: types.Message, command: CommandObject, bot: Bot):
+    if message.from_user.id != ADMIN_ID:
+        return
+    args = (command.args or "").strip().lower().split(maxsplit=1)
+    if not args or args[0] != "all":
+        await message.answer("Использование: /reroll all [категория]")
+        return
+    if len(args) == 1:
+        await deal_room(message, bot, decks.CATEGORIES)
+        return
+    cat = args[1]
+    if cat not in REROLL_CATEGORIES:
+        await message.answer("❌ Некорректная категория. Выберите из списка:\n" + ", ".join(REROLL_CATEGORIES))
+        return
+    await deal_room(message, bot, (REROLL_CATEGORIES[cat],), cat)
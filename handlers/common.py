@@ -32,11 +32,17 @@ async def cmd_admin(message: types.Message):
         return
     await message.answer(
         "🔧 Админ-панель:\n"
-        "/createroom - создать комнату\n"
+        "/createroom [колода] - создать комнату\n"
         "/closeroom - закрыть комнату\n"
         "/players - список игроков\n"
-        "/reload - обновить данные из таблицы\n"
+        "/reload [колода|all] - обновить данные из таблицы\n"
+        "/decks - список колод\n"
         "/addinfo - добавить информацию в /info\n"
+        "/deal - раздать новые карты всей комнате\n"
+        "/reroll all [категория] - пересдать категорию всем\n"
+        "/vote - начать голосование\n"
+        "/endvote - завершить голосование и показать итоги\n"
+        "/timer [секунды] - таймер раунда (/timer stop - остановить)\n"
         "/random - случайно изменить карту\n"
         "/swap - обменять карты между игроками\n"
         "/shuffle - перемешать карты категории\n"
@@ -1,7 +1,9 @@
 from aiogram import Router, types, Bot
 from aiogram.filters import Command
 import asyncpg
+import db
 from db import get_pool
+from events import log_event
 from config import ADMIN_ID
 
 router = Router()
@@ -20,9 +22,8 @@ def format_player_card(player):
 
 @router.message(Command("me"))
 async def cmd_me(message: types.Message):
-    pool = get_pool()
-    async with pool.acquire() as conn:
-        player = await conn.fetchrow("SELECT * FROM players WHERE user_id = $1", message.from_user.id)
+    async with db.acquire_read(message.from_user.id) as conn:
+        player = await db.fetch_player(conn, message.from_user.id)
         if not player:
             await message.answer("Вы не находитесь в комнате. Войдите через /room")
             return
@@ -34,7 +35,7 @@ async def cmd_card(message: types.Message, bot: Bot):
     card_num = 1 if message.text == "/card1" else 2
     pool = get_pool()
     async with pool.acquire() as conn:
-        player = await conn.fetchrow("SELECT * FROM players WHERE user_id = $1", message.from_user.id)
+        player = await db.fetch_player(conn, message.from_user.id)
         if not player:
             await message.answer("Вы не в комнате.")
             return
@@ -54,7 +55,8 @@ async def cmd_card(message: types.Message, bot: Bot):
             return
 
         # Помечаем использованной
-        await conn.execute(f"UPDATE players SET {used_field}=TRUE WHERE user_id=$1", message.from_user.id)
+        await db.mark_special_used(conn, message.from_user.id, card_num)
+        log_event(player['room_code'], 'card', message.from_user.id, card=card_num, special=special)
         # Отправляем уведомление админу
         await bot.send_message(
             ADMIN_ID,
@@ -2,29 +2,39 @@ from aiogram import Router, types
 from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 import asyncpg
+import logging
+import db
+import decks
 from db import get_pool
-from utils import generate_room_code, get_random_unique_values
-from config import ADMIN_ID
+from events import log_event
+from scheduler import scheduler
+from utils import generate_room_code
+from config import ADMIN_ID, DEFAULT_DECK
+from handlers import voting
 from handlers.states import AddInfo
 
 router = Router()
 
-# Кеш пула (будет заполнен при старте или через /reload)
-pool_cache = {}
-
 @router.message(Command("createroom"))
-async def cmd_createroom(message: types.Message):
+async def cmd_createroom(message: types.Message, command: CommandObject):
     if message.from_user.id != ADMIN_ID:
         return
+    deck = command.args.strip() if command.args else DEFAULT_DECK
+    try:
+        decks.check_deck(deck)
+    except ValueError as e:
+        await message.answer(f"❌ {e}")
+        return
     pool = get_pool()
     async with pool.acquire() as conn:
-        existing = await conn.fetchval("SELECT code FROM rooms WHERE is_active = TRUE")
+        existing = await db.fetch_active_room(conn)
         if existing:
             await message.answer(f"Уже есть активная комната {existing}. Сначала закройте её.")
             return
         code = generate_room_code()
-        await conn.execute("INSERT INTO rooms (code) VALUES ($1)", code)
-    await message.answer(f"✅ Комната создана! Код: {code}")
+        await db.create_room(conn, code, deck)
+    db.mark_write(message.from_user.id)
+    await message.answer(f"✅ Комната создана! Код: {code}\nКолода: {deck}")
 
 @router.message(Command("room"))
 async def cmd_room(message: types.Message, command: CommandObject, state: FSMContext):
@@ -34,20 +44,19 @@ async def cmd_room(message: types.Message, command: CommandObject, state: FSMCon
     code = command.args.upper()
     pool = get_pool()
     async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT * FROM rooms WHERE code = $1 AND is_active = TRUE", code)
+        room = await db.fetch_room(conn, code)
         if not room:
             await message.answer("Комната не найдена или уже закрыта.")
             return
         # Проверим, не в комнате ли уже игрок
-        existing = await conn.fetchval("SELECT user_id FROM players WHERE user_id = $1 AND room_code = $2", message.from_user.id, code)
-        if existing:
+        if await db.is_player_in_room(conn, message.from_user.id, code):
             await message.answer("Вы уже в этой комнате.")
             return
         # Если игрок был в другой комнате, удалим его оттуда
-        await conn.execute("DELETE FROM players WHERE user_id = $1", message.from_user.id)
+        await db.delete_player(conn, message.from_user.id)
         # Запросим имя игрока
         await state.set_state(AddInfo.choosing_player)  # временно используем состояние для ввода имени
-        await state.update_data(room_code=code)
+        await state.update_data(room_code=code, deck=room['deck'])
         await message.answer("Введите ваше имя (как вас называть в игре):")
 
 @router.message(AddInfo.choosing_player)
@@ -55,41 +64,30 @@ async def process_name(message: types.Message, state: FSMContext):
     data = await state.get_data()
     room_code = data['room_code']
     name = message.text.strip()
+    try:
+        # Колода грузится при первом входе в комнату с ней
+        deck = await decks.get_deck(data.get('deck', DEFAULT_DECK))
+    except Exception as e:
+        logging.exception("Не удалось загрузить колоду")
+        await message.answer(f"Ошибка: не удалось загрузить колоду ({e}).")
+        await state.clear()
+        return
     pool = get_pool()
     # Генерируем персонажа
     async with pool.acquire() as conn:
         # Получаем уже использованные в комнате значения
-        used = await conn.fetch("SELECT bio, prof, health, hobby, luggage1, luggage2, fact, special1, special2 FROM players WHERE room_code = $1", room_code)
-        used_bio = [r['bio'] for r in used]
-        used_prof = [r['prof'] for r in used]
-        used_health = [r['health'] for r in used]
-        used_hobby = [r['hobby'] for r in used]
-        used_luggage = [r['luggage1'] for r in used] + [r['luggage2'] for r in used]
-        used_fact = [r['fact'] for r in used]
-        used_special = [r['special1'] for r in used] + [r['special2'] for r in used]
+        used = decks.used_cards(await db.fetch_room_cards(conn, room_code))
 
-        # Выбираем уникальные значения из пула (используем глобальный кеш pool_cache, который должен быть загружен)
-        from handlers.admin_actions import pool_cache  # импортируем кеш из admin_actions
+        # Выбираем уникальные и совместимые по правилам колоды значения
         try:
-            bio = get_random_unique_values(pool_cache['bio'], used_bio)[0]
-            prof = get_random_unique_values(pool_cache['prof'], used_prof)[0]
-            health = get_random_unique_values(pool_cache['health'], used_health)[0]
-            hobby = get_random_unique_values(pool_cache['hobby'], used_hobby)[0]
-            fact = get_random_unique_values(pool_cache['fact'], used_fact)[0]
-            luggage = get_random_unique_values(pool_cache['luggage'], used_luggage, 2)
-            special = get_random_unique_values(pool_cache['special'], used_special, 2)
+            card = deck.deal_hand(used)
         except ValueError as e:
             await message.answer(f"Ошибка: {e}. Недостаточно уникальных карт в пуле.")
             await state.clear()
             return
 
         # Сохраняем игрока
-        await conn.execute('''
-            INSERT INTO players 
-            (user_id, room_code, username, name, bio, prof, health, hobby, luggage1, luggage2, fact, special1, special2)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
-        ''', message.from_user.id, room_code, message.from_user.username, name,
-           bio, prof, health, hobby, luggage[0], luggage[1], fact, special[0], special[1])
+        await db.insert_player(conn, message.from_user.id, room_code, message.from_user.username, name, card)
 
     await message.answer(f"✅ Вы вошли в комнату {room_code} под именем {name}.\nВаша карточка: /me")
     await state.clear()
@@ -100,25 +98,29 @@ async def cmd_closeroom(message: types.Message):
         return
     pool = get_pool()
     async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT code FROM rooms WHERE is_active = TRUE")
-        if not room:
+        code = await db.fetch_active_room(conn)
+        if not code:
             await message.answer("Нет активной комнаты.")
             return
-        await conn.execute("UPDATE rooms SET is_active = FALSE WHERE code = $1", room['code'])
-        await conn.execute("DELETE FROM players WHERE room_code = $1", room['code'])
-    await message.answer("Комната закрыта, все игроки удалены.")
+        await db.close_room(conn, code)
+        for timer_id in await db.delete_room_timers(conn, code):
+            scheduler.cancel(timer_id)
+    # Голосование закрытой комнаты больше не принимает голоса
+    await voting.finish_round(code)
+    db.mark_write(message.from_user.id)
+    log_event(code, 'close', message.from_user.id)
+    await message.answer("Комната закрыта, карточки игроков перенесены в архив.")
 
 @router.message(Command("players"))
 async def cmd_players(message: types.Message):
     if message.from_user.id != ADMIN_ID:
         return
-    pool = get_pool()
-    async with pool.acquire() as conn:
-        room = await conn.fetchrow("SELECT code FROM rooms WHERE is_active = TRUE")
-        if not room:
+    async with db.acquire_read(message.from_user.id) as conn:
+        code = await db.fetch_active_room(conn)
+        if not code:
             await message.answer("Нет активной комнаты.")
             return
-        players = await conn.fetch("SELECT name, username FROM players WHERE room_code = $1", room['code'])
+        players = await db.fetch_room_roster(conn, code)
     if not players:
         await message.answer("В комнате пока нет игроков.")
         return
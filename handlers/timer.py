@@ -0,0 +1,95 @@
+import logging
+import time
+from datetime import datetime, timezone
+from aiogram import Router, types, Bot
+from aiogram.filters import Command, CommandObject
+from config import ADMIN_ID
+import db
+from db import get_pool
+from scheduler import scheduler
+from utils import send_batch
+
+router = Router()
+
+MAX_TIMER_SECONDS = 3600
+# Таймер, истёкший во время простоя бота больше чем столько секунд назад, удаляется молча
+OVERDUE_GRACE_SECONDS = 60
+
+def format_duration(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    if minutes and seconds:
+        return f"{minutes} мин {seconds} с"
+    return f"{minutes} мин" if minutes else f"{seconds} с"
+
+def reminder_offsets(duration):
+    """За сколько секунд до конца напоминать: на половине раунда и за 10 секунд."""
+    offsets = []
+    if duration >= 60:
+        offsets.append(duration // 2)
+    if duration >= 30:
+        offsets.append(10)
+    return offsets
+
+async def notify_room(bot, room_code, text):
+    async with get_pool().acquire() as conn:
+        players = await db.fetch_room_members(conn, room_code)
+    recipients = {ADMIN_ID, *(p['user_id'] for p in players)}
+    await send_batch(bot, [(user_id, text) for user_id in recipients])
+
+async def finish_timer(bot, timer_id, room_code):
+    async with get_pool().acquire() as conn:
+        await db.delete_timer(conn, timer_id)
+    await notify_room(bot, room_code, "⏰ Время вышло!")
+
+def schedule_timer(bot, timer_id, room_code, duration, ends_at):
+    """Ставит в планировщик напоминания и конец таймера. Прошедшие напоминания пропускаются."""
+    now = time.time()
+    for offset in reminder_offsets(duration):
+        when = ends_at - offset
+        if when > now:
+            text = f"⏳ Осталось {format_duration(offset)}"
+            scheduler.schedule(when, timer_id, lambda text=text: notify_room(bot, room_code, text))
+    scheduler.schedule(ends_at, timer_id, lambda: finish_timer(bot, timer_id, room_code))
+
+async def restore_timers(bot):
+    """Поднимает таймеры из БД после перезапуска."""
+    now = time.time()
+    async with get_pool().acquire() as conn:
+        for row in await db.fetch_pending_timers(conn):
+            ends_at = row['ends_at'].timestamp()
+            if ends_at < now - OVERDUE_GRACE_SECONDS:
+                await db.delete_timer(conn, row['id'])
+                continue
+            schedule_timer(bot, row['id'], row['room_code'], row['duration'], ends_at)
+    logging.info(f"Таймеров в планировщике: {len(scheduler.keys)}")
+
+@router.message(Command("timer"))
+async def cmd_timer(message: types.Message, command: CommandObject, bot: Bot):
+    if message.from_user.id != ADMIN_ID:
+        return
+    arg = (command.args or "").strip().lower()
+    if arg != "stop" and not (arg.isdigit() and 0 < int(arg) <= MAX_TIMER_SECONDS):
+        await message.answer(f"Использование: /timer [секунды, до {MAX_TIMER_SECONDS}] или /timer stop")
+        return
+    pool = get_pool()
+    async with pool.acquire() as conn:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
+            await message.answer("❌ Нет активной комнаты.")
+            return
+        # В комнате одновременно идёт только один таймер
+        duration = None if arg == "stop" else int(arg)
+        ends_at = time.time() + duration if duration else None
+        async with conn.transaction():
+            stopped = await db.delete_room_timers(conn, room_code)
+            if duration:
+                timer_id = await db.create_timer(conn, room_code, duration,
+                                                 datetime.fromtimestamp(ends_at, timezone.utc))
+    # Планировщик трогаем только после фиксации транзакции
+    for old_id in stopped:
+        scheduler.cancel(old_id)
+    if not duration:
+        await message.answer("⏹ Таймер остановлен.")
+        return
+    schedule_timer(bot, timer_id, room_code, duration, ends_at)
+    await notify_room(bot, room_code, f"⏱ Запущен таймер на {format_duration(duration)}")
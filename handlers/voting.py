@@ -0,0 +1,141 @@
+import logging
+from collections import Counter
+from datetime import datetime
+from aiogram import Router, types, Bot, F
+from aiogram.filters import Command
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from config import ADMIN_ID, VOTE_FLUSH_INTERVAL
+import db
+from db import get_pool
+from utils import send_batch
+
+router = Router()
+
+class VoteRound:
+    """Голосование в комнате. Подсчёт ведётся в памяти, в БД голоса уходят пачками."""
+
+    def __init__(self, round_id, room_code, candidates):
+        self.round_id = round_id
+        self.room_code = room_code
+        # user_id -> имя; голосовать и быть выбранным могут только игроки на момент старта
+        self.candidates = candidates
+        self.ballots = {}
+        self.tally = Counter()
+
+    def cast(self, voter_id, target_id):
+        """Учитывает голос (повторный голос переносится на новую цель). Без await, поэтому атомарно."""
+        previous = self.ballots.get(voter_id)
+        if previous == target_id:
+            return False
+        if previous is not None:
+            self.tally[previous] -= 1
+        self.ballots[voter_id] = target_id
+        self.tally[target_id] += 1
+        return True
+
+    def results(self):
+        return sorted(((self.tally[uid], name) for uid, name in self.candidates.items()), reverse=True)
+
+# Код комнаты -> идущее голосование
+active_rounds = {}
+
+async def flush_votes(conn, votes):
+    # В пачке остаётся только последний голос каждого игрока
+    latest = {}
+    for vote in votes:
+        latest[vote[0], vote[1]] = vote
+    await db.upsert_votes(conn, list(latest.values()))
+
+votes_writer = db.BatchWriter("votes", flush_votes, VOTE_FLUSH_INTERVAL)
+
+async def finish_round(room_code):
+    """Снимает голосование комнаты, дописывает его голоса в БД и закрывает раунд. Возвращает раунд или None."""
+    # Убираем раунд из памяти до первого await, чтобы новые голоса больше не принимались
+    vote_round = active_rounds.pop(room_code, None)
+    if vote_round is None:
+        return None
+    # Голоса из памяти должны попасть в БД раньше, чем раунд будет закрыт
+    await votes_writer.flush()
+    try:
+        async with get_pool().acquire() as conn:
+            await db.close_vote_round(conn, vote_round.round_id)
+    except Exception:
+        logging.exception("Не удалось закрыть голосование в БД")
+    return vote_round
+
+def format_results(vote_round):
+    lines = [f"🗳 Итоги голосования (проголосовали {len(vote_round.ballots)} из {len(vote_round.candidates)}):"]
+    for count, name in vote_round.results():
+        lines.append(f"• {name}: {count}")
+    return "\n".join(lines)
+
+@router.message(Command("vote"))
+async def cmd_vote(message: types.Message, bot: Bot):
+    if message.from_user.id != ADMIN_ID:
+        return
+    pool = get_pool()
+    async with pool.acquire() as conn:
+        room_code = await db.fetch_active_room(conn)
+        if not room_code:
+            await message.answer("❌ Нет активной комнаты.")
+            return
+        if room_code in active_rounds:
+            await message.answer("❌ Голосование уже идёт. Завершите его командой /endvote.")
+            return
+        players = await db.fetch_room_members(conn, room_code)
+        if len(players) < 2:
+            await message.answer("❌ Для голосования нужно хотя бы два игрока.")
+            return
+        round_id = await db.create_vote_round(conn, room_code)
+
+    vote_round = VoteRound(round_id, room_code, {p['user_id']: p['name'] for p in players})
+    active_rounds[room_code] = vote_round
+
+    builder = InlineKeyboardBuilder()
+    for user_id, name in vote_round.candidates.items():
+        builder.button(text=name, callback_data=f"vote:{round_id}:{user_id}")
+    builder.adjust(2)
+    await send_batch(bot, [(user_id, "🗳 Голосование! Кого не берём в бункер?") for user_id in vote_round.candidates],
+                     reply_markup=builder.as_markup())
+    await message.answer(f"✅ Голосование начато, участников: {len(players)}. Итоги - /endvote.")
+
+@router.callback_query(F.data.startswith("vote:"))
+async def process_vote(callback: types.CallbackQuery):
+    try:
+        _, round_id, target_id = callback.data.split(":")
+        round_id, target_id = int(round_id), int(target_id)
+    except ValueError:
+        await callback.answer("Некорректный голос.")
+        return
+    vote_round = next((r for r in active_rounds.values() if r.round_id == round_id), None)
+    if vote_round is None:
+        await callback.answer("Это голосование уже завершено.", show_alert=True)
+        return
+    voter_id = callback.from_user.id
+    if voter_id not in vote_round.candidates:
+        await callback.answer("Вы не участвуете в этом голосовании.", show_alert=True)
+        return
+    if target_id not in vote_round.candidates:
+        await callback.answer("Этого игрока нет в голосовании.", show_alert=True)
+        return
+    if target_id == voter_id:
+        await callback.answer("Нельзя голосовать за себя.", show_alert=True)
+        return
+    if vote_round.cast(voter_id, target_id):
+        votes_writer.add((round_id, voter_id, target_id, datetime.now()))
+    await callback.answer(f"✅ Ваш голос: {vote_round.candidates[target_id]}")
+
+@router.message(Command("endvote"))
+async def cmd_endvote(message: types.Message, bot: Bot):
+    if message.from_user.id != ADMIN_ID:
+        return
+    pool = get_pool()
+    async with pool.acquire() as conn:
+        room_code = await db.fetch_active_room(conn)
+    vote_round = await finish_round(room_code) if room_code else None
+    if vote_round is None:
+        await message.answer("❌ Сейчас нет голосования.")
+        return
+    text = format_results(vote_round)
+    await message.answer(text)
+    await send_batch(bot, [(user_id, text) for user_id in vote_round.candidates])
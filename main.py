@@ -1,69 +1,163 @@
 import asyncio
+import json
 import logging
 import sys
 import traceback
 from aiogram import Bot, Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiohttp import web
 
-from config import BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PATH, WEBAPP_HOST, WEBAPP_PORT, SPREADSHEET_ID
-from db import create_pool, init_db, pool as db_pool_global
-from google_sheets import load_from_sheets, update_pool
-from handlers import common, room, player, info, admin_actions
+from config import (BOT_TOKEN, WEBHOOK_URL, WEBHOOK_PATH, WEBAPP_HOST, WEBAPP_PORT, DEFAULT_DECK,
+                    TELEGRAM_API_URL, USE_UVLOOP, SHUTDOWN_TIMEOUT, SNAPSHOT_PATH,
+                    THROTTLE_RATE, THROTTLE_BURST)
+import archive
+import db
+import decks
+from middlewares import ThrottlingMiddleware
+import snapshot
+from handlers import common, room, player, info, admin_actions, voting, timer
+from scheduler import scheduler
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
 
 logging.basicConfig(level=logging.INFO)
 
-async def on_startup(bot: Bot, db_pool):
-    await init_db(db_pool)
+# Дополнительные параметры asyncpg.create_pool (например, init для бенчмарков)
+POOL_OPTIONS = web.AppKey("pool_options", dict)
+
+async def warm_default_deck():
+    if DEFAULT_DECK in decks.cache:
+        # Колода уже восстановлена из снимка
+        return
     try:
-        categories = await load_from_sheets(SPREADSHEET_ID)
-        async with db_pool.acquire() as conn:
-            await update_pool(conn, categories)
-        admin_actions.pool_cache = categories
-        logging.info("Google Sheets data loaded")
+        await decks.reload_deck(DEFAULT_DECK)
+        logging.info(f"Deck {DEFAULT_DECK} loaded")
     except Exception as e:
-        logging.error(f"Failed to load sheets: {e}")
-    await bot.set_webhook(WEBHOOK_URL + WEBHOOK_PATH)
+        logging.error(f"Failed to load deck {DEFAULT_DECK}: {e}")
+
+async def database_ctx(app):
+    db_pool = await db.create_pool(**app.get(POOL_OPTIONS, {}))
+    await db.init_db(db_pool)
+    await db.create_replica_pool(**app.get(POOL_OPTIONS, {}))
+    yield
+    # Ждёт, пока обработчики вернут соединения, и закрывает пулы
+    await db.close_pool()
+
+async def writers_ctx(app):
+    for writer in db.batch_writers:
+        writer.start()
+    yield
+    # Дописываем накопленное, пока пул ещё открыт
+    for writer in db.batch_writers:
+        await writer.stop()
 
-async def on_shutdown(bot: Bot):
+async def snapshot_ctx(app):
+    if SNAPSHOT_PATH:
+        try:
+            await snapshot.restore(dp.storage)
+        except Exception:
+            logging.exception("Failed to restore snapshot")
+    yield
+    if SNAPSHOT_PATH:
+        try:
+            await snapshot.save(dp.storage)
+        except Exception:
+            logging.exception("Failed to save snapshot")
+
+async def bot_ctx(app):
+    # Telegram не будет присылать типы апдейтов, которые бот не обрабатывает
+    await bot.set_webhook(WEBHOOK_URL + WEBHOOK_PATH, allowed_updates=sorted(used_update_types))
+    yield
     await bot.delete_webhook()
+    await bot.session.close()
+
+async def restore_timers():
+    try:
+        await timer.restore_timers(bot)
+    except Exception as e:
+        logging.error(f"Failed to restore timers: {e}")
+
+async def background_ctx(app):
+    tasks = [asyncio.create_task(warm_default_deck()),
+             asyncio.create_task(scheduler.run()),
+             asyncio.create_task(restore_timers()),
+             asyncio.create_task(archive.run_archiver())]
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Сработавшие напоминания не должны обращаться к пулу после его закрытия
+    await scheduler.stop()
+
+def parse_update(body):
+    """Разбирает тело запроса в Update. Апдейты типов без обработчиков пропускаются без валидации."""
+    data = loads(body)
+    if used_update_types.isdisjoint(data):
+        return None
+    return types.Update.model_validate(data, context={"bot": bot})
 
 async def handle_webhook(request):
-    import sys
-    print("!!! WEBHOOK HANDLER CALLED !!!", file=sys.stderr)
-    sys.stderr.flush()
-    update = types.Update(**await request.json())
-    print(f"Received update ID: {update.update_id}", file=sys.stderr)
-    sys.stderr.flush()
-    await dp.feed_update(bot, update)
+    update = parse_update(await request.read())
+    if update is not None:
+        await dp.feed_update(bot, update)
     return web.Response()
 
-def main():
-    global bot, dp
+def create_bot():
+    if TELEGRAM_API_URL:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL))
+        return Bot(token=BOT_TOKEN, session=session)
+    return Bot(token=BOT_TOKEN)
+
+def create_app():
+    global bot, dp, used_update_types
     app = web.Application()
     app.router.add_post(WEBHOOK_PATH, handle_webhook)
 
-    bot = Bot(token=BOT_TOKEN)
+    bot = create_bot()
     dp = Dispatcher(storage=MemoryStorage())
-    dp.startup.register(on_startup)
-    dp.shutdown.register(on_shutdown)
+    # Внешний middleware срабатывает до фильтров и обработчиков, то есть до запросов к БД
+    if THROTTLE_RATE > 0 and THROTTLE_BURST > 0:
+        dp.message.outer_middleware(ThrottlingMiddleware())
 
     dp.include_router(common.router)
     dp.include_router(room.router)
     dp.include_router(player.router)
     dp.include_router(info.router)
     dp.include_router(admin_actions.router)
+    dp.include_router(voting.router)
+    dp.include_router(timer.router)
+    used_update_types = set(dp.resolve_used_update_types())
 
-    async def init_pool():
-        global db_pool_global
-        db_pool_global = await create_pool()
-        return db_pool_global
+    # Порядок важен: при остановке контексты закрываются в обратном порядке,
+    # поэтому пул БД закрывается последним
+    app.cleanup_ctx.append(database_ctx)
+    app.cleanup_ctx.append(writers_ctx)
+    app.cleanup_ctx.append(snapshot_ctx)
+    app.cleanup_ctx.append(bot_ctx)
+    app.cleanup_ctx.append(background_ctx)
+    return app
 
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(init_pool())
+def install_uvloop():
+    try:
+        import uvloop
+    except ImportError:
+        logging.info("uvloop не установлен, используется стандартный цикл событий")
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    logging.info("Используется uvloop")
 
-    # Запуск aiohttp приложения
-    web.run_app(app, host=WEBAPP_HOST, port=WEBAPP_PORT)
+def main():
+    if USE_UVLOOP:
+        install_uvloop()
+    # Пул, сессия бота и фоновые задачи живут в cleanup_ctx приложения,
+    # поэтому всё создаётся в том же цикле событий, что и сервер
+    web.run_app(create_app(), host=WEBAPP_HOST, port=WEBAPP_PORT, shutdown_timeout=SHUTDOWN_TIMEOUT)
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict
+from aiogram import BaseMiddleware, types
+from config import ADMIN_ID, THROTTLE_RATE, THROTTLE_BURST
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничивает частоту сообщений игрока: корзина токенов на пару (пользователь, команда).
+
+    Каждое сообщение тратит токен, токены восполняются со скоростью rate в секунду
+    до burst. Лишние сообщения отбрасываются до обработчиков и БД; об этом игрок
+    получает одно вежливое предупреждение, пока корзина снова не наполнится.
+    Администратор не ограничивается.
+    """
+
+    def __init__(self, rate=THROTTLE_RATE, burst=THROTTLE_BURST):
+        if rate <= 0 or burst <= 0:
+            raise ValueError("rate и burst должны быть больше нуля")
+        self.rate = rate
+        self.burst = burst
+        # Корзина без обращений дольше этого времени уже полна, её можно забыть
+        self.idle_seconds = burst / rate
+        # (user_id, команда) -> [токены, время последнего обращения, предупреждён ли];
+        # порядок - по последнему обращению, поэтому простаивающие корзины всегда в начале
+        self.buckets = OrderedDict()
+
+    def evict_idle(self, now):
+        while self.buckets:
+            key, bucket = next(iter(self.buckets.items()))
+            if now - bucket[1] < self.idle_seconds:
+                break
+            del self.buckets[key]
+
+    def allow(self, key, now):
+        """Тратит токен корзины key. Возвращает True, False или None (отказ, о котором уже предупредили)."""
+        self.evict_idle(now)
+        bucket = self.buckets.pop(key, None)
+        if bucket is None:
+            bucket = [self.burst, now, False]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        self.buckets[key] = bucket
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True
+        if bucket[2]:
+            return None
+        bucket[2] = True
+        return False
+
+    async def __call__(self, handler, event: types.Message, data):
+        user = event.from_user
+        if user is None or user.id == ADMIN_ID:
+            return await handler(event, data)
+        text = event.text or ""
+        command = text.split(maxsplit=1)[0].split("@", 1)[0].lower() if text.startswith("/") else ""
+        allowed = self.allow((user.id, command), time.monotonic())
+        if allowed:
+            return await handler(event, data)
+        if allowed is False:
+            await event.answer("⏳ Слишком много запросов. Подождите немного и попробуйте снова.")
+        return None
@@ -0,0 +1,79 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+class Scheduler:
+    """Все отложенные действия бота в одной задаче: куча по времени срабатывания.
+
+    Вместо отдельной спящей задачи на каждый таймер есть одна задача, которая спит
+    до ближайшего срока. Если добавлен более ранний срок, она просыпается раньше.
+    Время - UNIX-время (time.time()), чтобы сроки из БД можно было ставить как есть.
+    """
+
+    def __init__(self):
+        self.heap = []
+        # Ключи, записи которых ещё актуальны; отменённые записи удаляются из кучи лениво
+        self.keys = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._running = set()
+
+    def schedule(self, when, key, callback):
+        """Вызовет корутину callback() в момент when. key группирует записи для cancel."""
+        entry = (when, next(self._counter), key, callback)
+        heapq.heappush(self.heap, entry)
+        self.keys[key] = self.keys.get(key, 0) + 1
+        if self.heap[0] is entry:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        self.keys.pop(key, None)
+
+    def _pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            _, _, key, callback = heapq.heappop(self.heap)
+            if key not in self.keys:
+                continue
+            self.keys[key] -= 1
+            if not self.keys[key]:
+                del self.keys[key]
+            due.append(callback)
+        return due
+
+    def _next_delay(self):
+        while self.heap and self.heap[0][2] not in self.keys:
+            heapq.heappop(self.heap)
+        if not self.heap:
+            return None
+        return max(0.0, self.heap[0][0] - time.time())
+
+    async def _fire(self, callback):
+        try:
+            await callback()
+        except Exception:
+            logging.exception("Ошибка в отложенном действии")
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_delay())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            for callback in self._pop_due(time.time()):
+                # Отправка сообщений не должна задерживать остальные сроки
+                task = asyncio.create_task(self._fire(callback))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def stop(self):
+        """Отменяет уже сработавшие, но не завершённые действия (например, рассылку напоминания)."""
+        tasks = list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+scheduler = Scheduler()
@@ -0,0 +1,120 @@
+import dataclasses
+import json
+import logging
+import os
+import struct
+import zlib
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorageRecord
+from config import SNAPSHOT_PATH
+import db
+import decks
+from handlers import voting
+
+# Снимок состояния для быстрого перезапуска: заголовок MAGIC + версия, дальше JSON, сжатый zlib.
+# Внутри диалоги FSM из MemoryStorage, идущие голосования и загруженные колоды, а также
+# отпечатки данных БД на момент сохранения. При загрузке часть снимка принимается,
+# только если её отпечаток совпадает с текущим состоянием БД.
+MAGIC = b"BNKS"
+VERSION = 2
+HEADER = struct.Struct(">4sH")
+
+def encode(payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(MAGIC, VERSION) + zlib.compress(body)
+
+def decode(blob):
+    """Возвращает содержимое снимка или None, если файл чужой или другой версии."""
+    if len(blob) < HEADER.size:
+        return None
+    magic, version = HEADER.unpack_from(blob)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return json.loads(zlib.decompress(blob[HEADER.size:]).decode("utf-8"))
+
+def dump_storage(storage):
+    return [
+        [dataclasses.astuple(key), record.state, record.data]
+        for key, record in storage.storage.items()
+        if record.state is not None or record.data
+    ]
+
+def load_storage(storage, records):
+    for key, state, data in records:
+        storage.storage[StorageKey(*key)] = MemoryStorageRecord(data=data, state=state)
+
+def dump_votes():
+    return [
+        [r.round_id, r.room_code, list(r.candidates.items()), list(r.ballots.items())]
+        for r in voting.active_rounds.values()
+    ]
+
+def load_votes(rounds):
+    for round_id, room_code, candidates, ballots in rounds:
+        vote_round = voting.VoteRound(round_id, room_code, dict(candidates))
+        for voter_id, target_id in ballots:
+            vote_round.cast(voter_id, target_id)
+        voting.active_rounds[room_code] = vote_round
+
+def dump_decks():
+    return {
+        name: [{cat: [pool.values, pool.weights] for cat, pool in deck.pools.items()}, deck.rules]
+        for name, deck in decks.cache.decks.items()
+    }
+
+def load_decks(saved, fingerprint, current):
+    restored = []
+    for name, (categories, rules) in saved.items():
+        # Колода без строк в pool (например, подложенная в кеш напрямую) отпечатка не имеет и не восстанавливается
+        if name not in decks.DECKS or fingerprint.get(name) is None or fingerprint.get(name) != current.get(name):
+            continue
+        decks.cache.put(decks.Deck(name, {cat: dict(zip(values, weights))
+                                          for cat, (values, weights) in categories.items()},
+                                   [tuple(rule) for rule in rules]))
+        restored.append(name)
+    return restored
+
+async def fetch_fingerprint(conn):
+    return {
+        'rooms': await db.fetch_rooms_fingerprint(conn),
+        'decks': await db.fetch_decks_fingerprint(conn),
+    }
+
+async def save(storage, path=SNAPSHOT_PATH):
+    async with db.get_pool().acquire() as conn:
+        fingerprint = await fetch_fingerprint(conn)
+    blob = encode({
+        'fingerprint': fingerprint,
+        'fsm': dump_storage(storage),
+        'votes': dump_votes(),
+        'decks': dump_decks(),
+    })
+    # Пишем во временный файл, чтобы оборванная запись не испортила прошлый снимок
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(blob)
+    os.replace(tmp_path, path)
+    logging.info(f"Снимок состояния сохранён: {path} ({len(blob)} байт)")
+
+async def restore(storage, path=SNAPSHOT_PATH):
+    """Загружает снимок, если он есть и совпадает с БД. Возвращает имена восстановленных колод."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        payload = decode(f.read())
+    # Снимок одноразовый: после падения без сохранения старый снимок не должен всплыть снова
+    os.remove(path)
+    if payload is None:
+        logging.warning(f"Снимок {path} другой версии или повреждён, пропускаем")
+        return []
+    async with db.get_pool().acquire() as conn:
+        current = await fetch_fingerprint(conn)
+    saved = payload['fingerprint']
+    if saved['rooms'] == current['rooms']:
+        load_storage(storage, payload['fsm'])
+        load_votes(payload['votes'])
+    else:
+        logging.warning("Комнаты в БД изменились после снимка, диалоги и голосования не восстановлены")
+    restored = load_decks(payload['decks'], saved['decks'], current['decks'])
+    logging.info(f"Снимок восстановлен, колоды: {', '.join(restored) or 'нет'}")
+    return restored
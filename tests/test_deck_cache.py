@@ -0,0 +1,25 @@
+import decks
+
+
+def make_deck(name):
+    return decks.Deck(name, {cat: [f"{cat}{i}" for i in range(10)] for cat in decks.CATEGORIES})
+
+
+def test_contains_does_not_change_eviction_order():
+    first, second, third = make_deck('first'), make_deck('second'), make_deck('third')
+    cache = decks.DeckCache(first.nbytes + second.nbytes)
+    cache.put(first)
+    cache.put(second)
+    assert 'first' in cache
+    cache.put(third)
+    assert list(cache.decks) == ['second', 'third']
+
+
+def test_get_marks_deck_as_recently_used():
+    first, second, third = make_deck('first'), make_deck('second'), make_deck('third')
+    cache = decks.DeckCache(first.nbytes + second.nbytes)
+    cache.put(first)
+    cache.put(second)
+    assert cache.get('first') is first
+    cache.put(third)
+    assert list(cache.decks) == ['first', 'third']
@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+import decks
+
+
+def make_deck(rules, size=10):
+    categories = {cat: [f"{cat}{i}" for i in range(size)] for cat in decks.CATEGORIES}
+    return decks.Deck('test', categories, rules)
+
+
+def excluded_pairs(rules):
+    pairs = set()
+    for kind, cat1, value1, cat2, value2 in rules:
+        if kind == 'exclude':
+            pairs.add((value1, value2))
+            pairs.add((value2, value1))
+    return pairs
+
+
+def test_deal_never_breaks_exclusions():
+    random.seed(0)
+    rules = [('exclude', 'bio', f"bio{i}", 'prof', f"prof{j}")
+             for i in range(10) for j in range(10) if (i + j) % 2]
+    deck = make_deck(rules)
+    pairs = excluded_pairs(rules)
+    for _ in range(50):
+        for hand in deck.deal(5):
+            assert (hand['bio'], hand['prof']) not in pairs
+
+
+def test_deal_gives_different_cards():
+    random.seed(1)
+    deck = make_deck([('exclude', 'hobby', 'hobby0', 'fact', 'fact0')])
+    hands = deck.deal(5)
+    for slots in decks.CARD_SLOTS.values():
+        cards = [hand[slot] for hand in hands for slot in slots]
+        assert len(cards) == len(set(cards))
+
+
+def test_card_excluding_whole_category_is_skipped():
+    random.seed(2)
+    rules = [('exclude', 'bio', 'bio0', 'prof', f"prof{j}") for j in range(10)]
+    deck = make_deck(rules)
+    for _ in range(200):
+        assert deck.deal_hand({})['bio'] != 'bio0'
+
+
+def test_redeal_respects_kept_cards():
+    random.seed(3)
+    rules = [('exclude', 'bio', 'bio0', 'prof', f"prof{j}") for j in range(9)]
+    deck = make_deck(rules)
+    for _ in range(50):
+        assert deck.deal_hand({}, ('prof',), keep={'bio': 'bio0'}) == {'prof': 'prof9'}
+    hands = deck.deal(2, ('prof',), keeps=[{'bio': 'bio0'}, {'bio': 'bio1'}])
+    assert hands[0] == {'prof': 'prof9'}
+    assert hands[1]['prof'] != 'prof9'
+
+
+def test_synergy_with_kept_card(monkeypatch):
+    random.seed(4)
+    monkeypatch.setattr(decks, 'SYNERGY_CHANCE', 1.0)
+    deck = make_deck([('synergy', 'hobby', 'hobby3', 'fact', 'fact7')])
+    for _ in range(20):
+        assert deck.deal_hand({}, ('fact',), keep={'hobby': 'hobby3'}) == {'fact': 'fact7'}
+
+
+def test_raises_when_no_compatible_card_left():
+    rules = [('exclude', 'bio', 'bio0', 'prof', f"prof{j}") for j in range(9)]
+    deck = make_deck(rules)
+    with pytest.raises(ValueError):
+        deck.deal_hand({'prof': ['prof9']}, ('prof',), keep={'bio': 'bio0'})
+
+
+def test_rules_with_unknown_cards_are_ignored():
+    deck = make_deck([('exclude', 'bio', 'bio-missing', 'prof', 'prof0')])
+    assert deck.excludes == {}
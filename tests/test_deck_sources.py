@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+from deck_sources import collect_cards, parse_card, row_cards
+
+
+async def pages_of(*pages):
+    for page in pages:
+        yield page
+
+
+def test_parse_card_weight_suffix():
+    assert parse_card("Хирург | редкая") == ("Хирург", 0.3)
+    assert parse_card("Хирург|0,5") == ("Хирург", 0.5)
+    assert parse_card("Хирург") == ("Хирург", 1.0)
+    assert parse_card("Хирург", 0.1) == ("Хирург", 0.1)
+
+
+def test_parse_card_keeps_pipe_that_is_not_weight():
+    assert parse_card("Да | нет") == ("Да | нет", 1.0)
+
+
+def test_row_weight_applies_only_to_its_card():
+    row = ["Мужчина", "Хирург | редкая", "Здоров", "Шахматы", "Нож | легендарная", "Аптечка",
+           "Факт", "Особое 1", "Особое 2"]
+    weights = {value: weight for _, value, weight in row_cards(row)}
+    assert weights == {"Мужчина": 1.0, "Хирург": 0.3, "Здоров": 1.0, "Шахматы": 1.0, "Нож": 0.1,
+                       "Аптечка": 1.0, "Факт": 1.0, "Особое 1": 1.0, "Особое 2": 1.0}
+
+
+def test_conflicting_duplicate_weights_are_logged(caplog):
+    pages = pages_of([('prof', "Хирург", 1.0)], [('prof', "Хирург", 0.1), ('prof', "Повар", 1.0)])
+    with caplog.at_level(logging.WARNING):
+        cards = asyncio.run(collect_cards(pages))
+    assert cards['prof'] == {"Хирург": 1.0, "Повар": 1.0}
+    assert "Хирург" in caplog.text
@@ -0,0 +1,55 @@
+import random
+from collections import Counter
+
+import pytest
+
+from utils import AliasTable, WeightedPool, iter_bits
+
+
+def test_alias_table_frequencies_follow_weights():
+    random.seed(0)
+    weights = [1.0, 2.0, 7.0]
+    table = AliasTable(weights)
+    draws = 100_000
+    counts = Counter(table.draw() for _ in range(draws))
+    for i, w in enumerate(weights):
+        assert counts[i] / draws == pytest.approx(w / sum(weights), abs=0.01)
+
+
+def test_alias_table_never_draws_zero_weight():
+    random.seed(1)
+    table = AliasTable([0.0, 1.0, 0.0, 3.0])
+    assert {table.draw() for _ in range(10_000)} <= {1, 3}
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b1010_0000_0001)) == [0, 9, 11]
+    assert list(iter_bits(1 << 100)) == [100]
+
+
+def test_sample_skips_excluded_values():
+    random.seed(2)
+    pool = WeightedPool(['a', 'b', 'c', 'd'], [100.0, 1.0, 1.0, 1.0])
+    for _ in range(200):
+        result = pool.sample(['a', 'c'], 2)
+        assert sorted(result) == ['b', 'd']
+
+
+def test_sample_raises_when_pool_is_exhausted():
+    pool = WeightedPool(['a', 'b', 'c'])
+    with pytest.raises(ValueError):
+        pool.sample(['a', 'b'], 2)
+
+
+def test_draw_index_respects_forbidden_mask():
+    random.seed(3)
+    pool = WeightedPool(['a', 'b', 'c', 'd'], [50.0, 50.0, 1.0, 1.0])
+    forbidden = pool.mask(['a', 'b', 'd'])
+    assert {pool.draw_index(forbidden) for _ in range(200)} == {2}
+
+
+def test_draw_index_raises_when_everything_is_forbidden():
+    pool = WeightedPool(['a', 'b'])
+    with pytest.raises(ValueError):
+        pool.draw_index(pool.full_mask)
@@ -1,3 +1,5 @@
+import asyncio
+import logging
 import random
 import string
 from typing import List, Dict
@@ -11,6 +13,23 @@ def get_random_unique_values(pool: List[str], exclude: List[str], count: int = 1
         raise ValueError(f"Недостаточно уникальных значений в пуле. Требуется {count}, доступно {len(available)}")
     return random.sample(available, count)
 
+async def send_batch(bot, messages, concurrency=10, reply_markup=None):
+    """Рассылает пары (chat_id, текст) параллельно, не больше concurrency запросов одновременно.
+
+    reply_markup, если передан, прикрепляется к каждому сообщению.
+    Ошибка доставки одному получателю не мешает остальным.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(chat_id, text):
+        async with semaphore:
+            try:
+                await bot.send_message(chat_id, text, reply_markup=reply_markup)
+            except Exception as e:
+                logging.warning(f"Не удалось отправить сообщение {chat_id}: {e}")
+
+    await asyncio.gather(*(send(chat_id, text) for chat_id, text in messages))
+
 def shuffle_luggage(players: List[Dict]) -> List[Dict]:
     # Собираем все багажи
     all_luggage = []
@@ -25,3 +44,110 @@ def shuffle_luggage(players: List[Dict]) -> List[Dict]:
         p['luggage2'] = all_luggage[2*i+1]
         new_players.append(p)
     return new_players
+
+class AliasTable:
+    """Таблица псевдонимов (метод Уокера-Воуза): выбор индекса с заданными весами за O(1)."""
+
+    def __init__(self, weights):
+        n = len(weights)
+        self.n = n
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        if n == 0:
+            return
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # Остатки из-за погрешности округления считаем полными ячейками
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def draw(self):
+        i = int(random.random() * self.n)
+        return i if random.random() < self.prob[i] else self.alias[i]
+
+def iter_bits(mask: int):
+    """Номера единичных битов маски по возрастанию."""
+    for byte_index, byte in enumerate(mask.to_bytes((mask.bit_length() + 7) // 8, 'little')):
+        while byte:
+            low = byte & -byte
+            yield byte_index * 8 + low.bit_length() - 1
+            byte ^= low
+
+class WeightedPool:
+    """Значения категории с весами и готовой таблицей псевдонимов для быстрого выбора."""
+
+    # После стольких подряд попаданий в занятые значения переходим к перебору оставшихся
+    MAX_REJECTIONS = 32
+
+    def __init__(self, values: List[str], weights: List[float] = None):
+        self.values = values
+        self.weights = weights if weights is not None else [1.0] * len(values)
+        self.index = {v: i for i, v in enumerate(values)}
+        self.table = AliasTable(self.weights)
+        # Маска всех значений пула для операций с битовыми масками
+        self.full_mask = (1 << len(values)) - 1
+
+    def sample(self, exclude: List[str], count: int = 1) -> List[str]:
+        """Выбирает count разных значений не из exclude, с вероятностью пропорционально весу."""
+        taken = {v for v in exclude if v in self.index}
+        available = len(self.values) - len(taken)
+        if available < count:
+            raise ValueError(f"Недостаточно уникальных значений в пуле. Требуется {count}, доступно {available}")
+        result = []
+        rejections = 0
+        while len(result) < count:
+            value = self.values[self.table.draw()]
+            if value in taken:
+                rejections += 1
+                if rejections > self.MAX_REJECTIONS:
+                    return result + self._sample_remaining(taken, count - len(result))
+                continue
+            taken.add(value)
+            result.append(value)
+        return result
+
+    def mask(self, values) -> int:
+        """Битовая маска индексов значений из values (незнакомые значения пропускаются)."""
+        bits = bytearray((len(self.values) + 7) // 8)
+        for v in values:
+            i = self.index.get(v)
+            if i is not None:
+                bits[i >> 3] |= 1 << (i & 7)
+        return int.from_bytes(bits, 'little')
+
+    def draw_index(self, forbidden: int) -> int:
+        """Индекс случайного значения вне битовой маски forbidden, с вероятностью пропорционально весу."""
+        if self.values:
+            for _ in range(self.MAX_REJECTIONS):
+                i = self.table.draw()
+                if not forbidden >> i & 1:
+                    return i
+        allowed = self.full_mask & ~forbidden
+        if not allowed:
+            raise ValueError("Недостаточно подходящих значений в пуле")
+        return self.choose_index(allowed)
+
+    def choose_index(self, mask: int) -> int:
+        """Индекс случайного значения из непустой битовой маски mask, с учётом весов."""
+        candidates = list(iter_bits(mask))
+        return random.choices(candidates, [self.weights[i] for i in candidates])[0]
+
+    def _sample_remaining(self, taken, count):
+        # Почти все тяжёлые значения заняты: выбираем из оставшихся напрямую
+        values = [v for v in self.values if v not in taken]
+        weights = [self.weights[self.index[v]] for v in values]
+        result = []
+        for _ in range(count):
+            i = random.choices(range(len(values)), weights)[0]
+            result.append(values.pop(i))
+            weights.pop(i)
+        return result